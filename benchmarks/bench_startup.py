@@ -0,0 +1,161 @@
+"""Startup time of the application.
+
+Usage:
+    python -m benchmarks.bench_startup [--repeat 5] [--tk] [--output startup.json]
+                                       [--baseline startup.json] [--tolerance 0.25]
+
+Every run is a fresh interpreter. Recorded per case, best and median over
+--repeat runs:
+
+- import: time to import main, measured inside the child process. The
+  modules that should only load on first use (ImageDraw, ImageFont,
+  ImageTk, cProfile and the exporters) are checked too, and any that
+  were imported anyway are listed under 'eager_modules'.
+- window (with --tk, needs a display, e.g. Xvfb): time from starting the
+  process until the main window is mapped, and until the deferred
+  panels have been built.
+
+With --baseline the results are compared as in bench_suite and the
+command exits with status 1 on a regression or on eagerly loaded modules.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.bench_suite import compare
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use; importing main must not pull these in
+LAZY_MODULES = ('PIL.ImageDraw', 'PIL.ImageFont', 'PIL.ImageTk', 'cProfile',
+                'src.utils.grid_export', 'src.utils.label_cache', 'src.utils.vector_export')
+
+IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import main
+elapsed = time.perf_counter() - start
+print(json.dumps({'import_ms': elapsed * 1000,
+                  'eager': [name for name in %r if name in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+WINDOW_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import tkinter as tk
+import main
+imported = time.perf_counter()
+root = tk.Tk()
+app = main.ArtGridApp(root)
+times = {'import_ms': (imported - start) * 1000}
+
+def mapped(event):
+    if event.widget is root and 'mapped_ms' not in times:
+        times['mapped_ms'] = (time.perf_counter() - start) * 1000
+        print('mapped', flush=True)
+
+def check_panels():
+    if app.controls.secondary_built:
+        root.update_idletasks()
+        times['panels_ms'] = (time.perf_counter() - start) * 1000
+        print(json.dumps(times), flush=True)
+        root.destroy()
+    else:
+        root.after(1, check_panels)
+
+root.bind('<Map>', mapped, add='+')
+root.after(1, check_panels)
+root.mainloop()
+"""
+
+
+def run_child(script):
+    """Run script in a fresh interpreter; return (its output lines, seconds until each line)"""
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', script], cwd=ROOT,
+                               stdout=subprocess.PIPE, text=True)
+    lines, arrivals = [], []
+    for line in process.stdout:
+        arrivals.append(time.perf_counter() - start)
+        lines.append(line.strip())
+    if process.wait() != 0:
+        raise RuntimeError(f"Startup script failed with status {process.returncode}")
+    return lines, arrivals
+
+
+def summarize(samples):
+    return {'wall_min_ms': min(samples), 'wall_median_ms': statistics.median(samples)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="runs per case (default 5)")
+    parser.add_argument('--tk', action='store_true', help="also time the window appearing (needs a display)")
+    parser.add_argument('--output', default='startup_results.json',
+                        help="where to write the results (default startup_results.json)")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative growth before a case counts as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    imports, eager = [], set()
+    for _ in range(args.repeat):
+        lines, _ = run_child(IMPORT_SCRIPT)
+        result = json.loads(lines[-1])
+        imports.append(result['import_ms'])
+        eager.update(result['eager'])
+    results = {'import': dict(summarize(imports), eager_modules=sorted(eager))}
+
+    if args.tk:
+        mapped, panels, process_mapped = [], [], []
+        for _ in range(args.repeat):
+            lines, arrivals = run_child(WINDOW_SCRIPT)
+            times = json.loads(lines[-1])
+            mapped.append(times['mapped_ms'])
+            panels.append(times['panels_ms'])
+            # Includes interpreter start-up, as a user launching the app sees it
+            process_mapped.append(arrivals[lines.index('mapped')] * 1000)
+        results['window_mapped'] = summarize(mapped)
+        results['panels_built'] = summarize(panels)
+        results['process_to_window'] = summarize(process_mapped)
+
+    for name, result in results.items():
+        print(f"{name:<20} {result['wall_min_ms']:>8.1f}ms (median {result['wall_median_ms']:.1f}ms)")
+    if eager:
+        print(f"Loaded at startup but should be lazy: {', '.join(sorted(eager))}")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'frozen': getattr(sys, 'frozen', False),
+            'repeat': args.repeat,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    status = 1 if eager else 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            status = 1
+        else:
+            print(f"No regressions against {args.baseline}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,317 @@
+"""Headless benchmarks for the resize, export and canvas grid hot paths.
+
+Usage:
+    python -m benchmarks.bench_suite [--sizes 1,12,50,150 | --quick] [--cells 10,50,200]
+                                     [--repeat 3] [--output results.json]
+                                     [--baseline baseline.json] [--tolerance 0.25]
+
+Every case runs in a fresh process on a synthetic image so peak RSS
+belongs to that case alone. --quick runs only the 1 and 12 MP sizes.
+Per case the JSON records the best and median wall time over at least
+--repeat runs (fast cases are repeated until they have run for
+MIN_CASE_SECONDS), the process's peak RSS, and from one extra
+run under tracemalloc the peak traced Python allocation and the number
+of allocation blocks still live afterwards. Pillow's pixel buffers are
+not seen by tracemalloc, which is why RSS is recorded too.
+
+Canvas cases use benchmarks.stub_canvas unless a display is available
+(e.g. under Xvfb) and --tk is given, in which case a real Tk canvas is
+drawn and flushed with update().
+
+With --baseline, each case is compared against the saved results and the
+command exits with status 1 when wall time or peak RSS grew by more than
+--tolerance. Wall time growth under NOISE_FLOOR_MS is never a regression.
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+import PIL
+from PIL import Image
+
+try:
+    import resource
+except ImportError:
+    # Windows
+    resource = None
+
+
+DEFAULT_SIZES = '1,12,50,150'
+QUICK_SIZES = '1,12'
+DEFAULT_CELLS = '10,50,200'
+VIEW_SIZE = (1000, 700)
+CANVAS_ZOOMS = (0.1, 1.0, 4.0)
+EXPORT_FACTOR = 0.5
+# Fast cases are repeated until they have run this long, so sub-millisecond
+# timings are not a handful of samples (and at most MAX_RUNS times)
+MIN_CASE_SECONDS = 0.2
+MAX_RUNS = 1000
+# Timer and scheduler jitter; smaller wall time growth is not a regression
+NOISE_FLOOR_MS = 1.0
+
+
+def synthetic_image(megapixels):
+    """A deterministic 3:2 RGB image with smooth detail in every channel"""
+    width = int((megapixels * 1_000_000 * 1.5) ** 0.5)
+    height = int(width / 1.5)
+    gradient = Image.linear_gradient('L')
+    bands = [gradient.resize((width, height), Image.BILINEAR),
+             gradient.rotate(90).resize((width, height), Image.BILINEAR),
+             gradient.rotate(45).resize((width, height), Image.BILINEAR)]
+    return Image.merge('RGB', bands)
+
+
+def peak_rss_mb():
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Kilobytes on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+    try:
+        import psutil
+    except ImportError:
+        return None
+    return psutil.Process().memory_info().peak_wset / (1024 * 1024)
+
+
+def make_canvas(use_tk):
+    if use_tk:
+        import tkinter as tk
+        root = tk.Tk()
+        canvas = tk.Canvas(root, width=VIEW_SIZE[0], height=VIEW_SIZE[1])
+        canvas.pack()
+        root.update()
+        return canvas, root.update
+    from benchmarks.stub_canvas import StubCanvas
+    return StubCanvas(*VIEW_SIZE), lambda: None
+
+
+def setup_case(case):
+    """Build the state a case needs and return (run, extra) where run() is timed"""
+    from src.utils.grid_export import GridExporter
+    from src.utils.grid_utils import GridLayout, GridRenderer
+    from src.utils.image_source import PILImageSource
+    from src.utils.image_utils import ImageProcessor
+
+    kind, megapixels = case['kind'], case['megapixels']
+    image = synthetic_image(megapixels)
+    image.load()
+    extra = {'image_size': list(image.size)}
+
+    if kind == 'resize_cold':
+        # Pyramid build plus the first resampled display image
+        def run():
+            processor = ImageProcessor()
+            processor.source = PILImageSource(image)
+            processor.resize_image(0.37)
+        return run, extra
+
+    if kind == 'resize_zoom':
+        processor = ImageProcessor()
+        processor.source = PILImageSource(image)
+        processor.build_pyramid()
+
+        def run():
+            processor.resize_image(0.61)
+        return run, extra
+
+    if kind == 'export':
+        exporter = GridExporter()
+        output_dir = tempfile.mkdtemp(prefix='gridbench')
+        output_path = os.path.join(output_dir, 'export.tif')
+        cell = case['cell']
+
+        def run():
+            exporter.export_image_with_grid(image, output_path, cell, cell, 2, 'red', EXPORT_FACTOR)
+        return run, extra
+
+    if kind in ('canvas_draw', 'canvas_pan'):
+        canvas, flush = make_canvas(case.get('tk', False))
+        renderer = GridRenderer()
+        if not case.get('tk', False):
+            # The raster path needs a Tk PhotoImage
+            renderer.display_mode = 'vector'
+        cell, zoom = case['cell'], case['zoom']
+        width, height = image.size
+        state = {'x': 0, 'dx': -GridRenderer.DRAW_MARGIN}
+
+        layout = GridLayout.for_grid(width, height, cell, cell)
+
+        def draw(img_x, img_y):
+            renderer.draw_grid_on_canvas(canvas, img_x, img_y, layout, 2, 'red', zoom, *VIEW_SIZE)
+            renderer.draw_coordinates_on_canvas(canvas, img_x, img_y, layout, zoom, *VIEW_SIZE)
+            flush()
+
+        if not case.get('tk', False):
+            # Named Tk fonts need a Tk root
+            renderer.canvas_font = lambda canvas, size: f"Arial {size}"
+
+        if kind == 'canvas_draw':
+            def run():
+                renderer.clear()
+                draw(40, 40)
+        else:
+            draw(40, 40)
+
+            def run():
+                # A drag far enough to refill the grid, as the redraw scheduler would;
+                # back and forth so the grid stays in view
+                state['dx'] = -state['dx']
+                state['x'] += state['dx']
+                renderer.pan(canvas, state['dx'], 0)
+                draw(40 + state['x'], 40)
+
+        def items():
+            return len(canvas.find_all()) if hasattr(canvas, 'find_all') else len(canvas.items)
+        extra['items'] = items
+        extra['calls'] = lambda: getattr(canvas, 'calls', None)
+        return run, extra
+
+    raise ValueError(f"Unknown benchmark kind: {kind}")
+
+
+def run_case(case, repeat):
+    run, extra = setup_case(case)
+    setup_rss = peak_rss_mb()
+
+    times = []
+    while len(times) < repeat or (sum(times) < MIN_CASE_SECONDS and len(times) < MAX_RUNS):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    run()
+    _, traced_peak = tracemalloc.get_traced_memory()
+    live_blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics('filename'))
+    tracemalloc.stop()
+
+    result = {
+        'wall_min_ms': min(times) * 1000,
+        'wall_median_ms': statistics.median(times) * 1000,
+        'runs': len(times),
+        'peak_rss_mb': peak_rss_mb(),
+        'setup_rss_mb': setup_rss,
+        'py_alloc_peak_kb': traced_peak / 1024,
+        'py_alloc_live_blocks': live_blocks,
+    }
+    for name, value in extra.items():
+        result[name] = value() if callable(value) else value
+    return result
+
+
+def case_name(case):
+    name = f"{case['kind']}/{case['megapixels']}mp"
+    if 'cell' in case:
+        name += f"/cell{case['cell']}"
+    if 'zoom' in case:
+        name += f"/zoom{case['zoom']}"
+    return name
+
+
+def build_cases(sizes, cells, use_tk):
+    cases = []
+    for megapixels in sizes:
+        cases.append({'kind': 'resize_cold', 'megapixels': megapixels})
+        cases.append({'kind': 'resize_zoom', 'megapixels': megapixels})
+        for cell in cells:
+            cases.append({'kind': 'export', 'megapixels': megapixels, 'cell': cell})
+            for zoom in CANVAS_ZOOMS:
+                for kind in ('canvas_draw', 'canvas_pan'):
+                    cases.append({'kind': kind, 'megapixels': megapixels, 'cell': cell,
+                                  'zoom': zoom, 'tk': use_tk})
+    return cases
+
+
+def compare(results, baseline, tolerance, noise_floor_ms=NOISE_FLOOR_MS):
+    """Return a list of human readable regressions against the baseline.
+
+    Wall time has to grow by more than noise_floor_ms as well as by the
+    tolerance, so sub-millisecond cases do not flag jitter.
+    """
+    regressions = []
+    for name, result in results.items():
+        previous = baseline.get('results', {}).get(name)
+        if previous is None:
+            continue
+        for metric in ('wall_min_ms', 'peak_rss_mb'):
+            old, new = previous.get(metric), result.get(metric)
+            if metric == 'wall_min_ms' and old and new and new - old <= noise_floor_ms:
+                continue
+            if old and new and new > old * (1 + tolerance):
+                regressions.append(f"{name}: {metric} {old:.1f} -> {new:.1f} (+{(new / old - 1) * 100:.0f}%)")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', help=f"image sizes in megapixels (default {DEFAULT_SIZES})")
+    parser.add_argument('--quick', action='store_true',
+                        help=f"only the smaller sizes ({QUICK_SIZES}) unless --sizes is given")
+    parser.add_argument('--cells', default=DEFAULT_CELLS,
+                        help=f"grid cell sizes in pixels (default {DEFAULT_CELLS})")
+    parser.add_argument('--repeat', type=int, default=3,
+                        help="least timed runs per case; fast cases run more (default 3)")
+    parser.add_argument('--filter', default='', help="only run cases whose name contains this text")
+    parser.add_argument('--tk', action='store_true', help="draw canvas cases on a real Tk canvas")
+    parser.add_argument('--output', default='benchmark_results.json',
+                        help="where to write the results (default benchmark_results.json)")
+    parser.add_argument('--baseline', help="results file to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="allowed relative growth before a case counts as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    sizes = [float(v) if '.' in v else int(v) for v in sizes.split(',')]
+    cells = [int(v) for v in args.cells.split(',')]
+    cases = [case for case in build_cases(sizes, cells, args.tk) if args.filter in case_name(case)]
+
+    results = {}
+    context = get_context('spawn')
+    for case in cases:
+        name = case_name(case)
+        # A fresh process per case keeps peak RSS attributable
+        with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+            result = executor.submit(run_case, case, args.repeat).result()
+        results[name] = result
+        rss = result['peak_rss_mb']
+        print(f"{name:<40} {result['wall_min_ms']:>10.2f}ms "
+              f"{rss if rss is not None else float('nan'):>8.0f}MB "
+              f"{result['py_alloc_peak_kb']:>10.0f}KB py")
+
+    report = {
+        'meta': {
+            'python': platform.python_version(),
+            'pillow': PIL.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'repeat': args.repeat,
+            'min_case_seconds': MIN_CASE_SECONDS,
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            return 1
+        print(f"No regressions against {args.baseline}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,68 @@
+"""Minimal stand-in for tkinter.Canvas used by headless benchmarks.
+
+It implements the item calls GridRenderer makes and counts them, which
+approximates the number of Tcl round-trips a real canvas would see.
+"""
+import itertools
+
+
+class StubCanvas:
+    def __init__(self, width=1000, height=700):
+        self.width = width
+        self.height = height
+        self.items = {}
+        self.calls = 0
+        self.ids = itertools.count(1)
+
+    def winfo_width(self):
+        return self.width
+
+    def winfo_height(self):
+        return self.height
+
+    def _create(self, kind, coords, options):
+        self.calls += 1
+        item = next(self.ids)
+        tags = options.get('tags', ())
+        self.items[item] = (kind, list(coords), (tags,) if isinstance(tags, str) else tuple(tags))
+        return item
+
+    def create_line(self, *coords, **options):
+        return self._create('line', coords, options)
+
+    def create_text(self, *coords, **options):
+        return self._create('text', coords, options)
+
+    def create_image(self, *coords, **options):
+        return self._create('image', coords, options)
+
+    def _matching(self, tag_or_id):
+        return [item for item, (_, _, tags) in self.items.items()
+                if item == tag_or_id or tag_or_id in tags or tag_or_id == 'all']
+
+    def coords(self, item, *coords):
+        self.calls += 1
+        if coords:
+            self.items[item][1][:] = coords
+        return self.items[item][1]
+
+    def itemconfig(self, item, **options):
+        self.calls += 1
+
+    def move(self, tag_or_id, dx, dy):
+        self.calls += 1
+        for item in self._matching(tag_or_id):
+            coords = self.items[item][1]
+            coords[:] = [value + (dx if i % 2 == 0 else dy) for i, value in enumerate(coords)]
+
+    def delete(self, *tags_or_ids):
+        self.calls += 1
+        for tag_or_id in tags_or_ids:
+            for item in self._matching(tag_or_id):
+                del self.items[item]
+
+    def tag_raise(self, *args):
+        self.calls += 1
+
+    def tag_lower(self, *args):
+        self.calls += 1
@@ -1,63 +1,145 @@
 import tkinter as tk
-from tkinter import filedialog, colorchooser, Label
+from tkinter import filedialog, colorchooser, Frame, Label
+import functools
 import os
+import time
 
 from src.ui.controls import ControlPanels
 from src.ui.canvas import ImageCanvas
-from PIL import Image, ImageTk
+from src.ui.redraw_scheduler import RedrawScheduler
+from src.ui.view_state import (DEFAULT_VIEW, COLOR_FIELDS, GRID_FIELDS, IMAGE_FIELDS, PAN_FIELDS,
+                               UNDO_FIELDS, ViewHistory, changed_fields, view_property)
+from PIL import Image
 from src.utils.image_utils import ImageProcessor
-from src.utils.grid_utils import GridRenderer, GridExporter
+from src.utils.grid_utils import GridLayout, GridRenderer
+from src.utils.export_queue import ExportJob, ExportQueue
+from src.utils.tile_renderer import TileRenderer
+from src.utils.frame_profiler import FrameProfiler
+from src.utils.project import PROJECT_EXTENSION, load_project, save_project
 from src.utils.unit_converter import UnitConverter
 
 
+# Seconds between refreshes of the profiler HUD
+HUD_INTERVAL = 0.25
+# Milliseconds between status bar updates while exports are running
+EXPORT_POLL_MS = 100
+# Seconds to wait on close for cancelled exports to remove their partial files
+EXPORT_CLOSE_TIMEOUT = 2.0
+# Delay after the window first appears before the resize and slider panels are built
+SECONDARY_PANEL_DELAY_MS = 10
+EXPORT_STAGE_NAMES = {
+    'resize': "resizing",
+    'grid': "drawing grid",
+    'labels': "drawing labels",
+    'encode': "encoding",
+}
+
 
 class ArtGridApp:
+    # View settings live in one immutable ViewState record, self.view
+    pan_x = view_property('pan_x')
+    pan_y = view_property('pan_y')
+    canvas_zoom_factor = view_property('canvas_zoom_factor')
+    grid_size = view_property('grid_size')
+    line_thickness = view_property('line_thickness')
+    grid_color = view_property('grid_color')
+
     def __init__(self, root):
         self.root = root
         self.root.title("Art Grid with Coordinates")
         self.root.geometry("1000x800")
 
-        self.grid_size = 1.0
-        self.line_thickness = 1
+        self.view = DEFAULT_VIEW
+        # What is currently on the canvas, so a redraw only redoes what changed
+        self.rendered_view = None
+        self.rendered_canvas_size = None
+        self.rendered_resample = None
+        self.history = ViewHistory()
         self.image_resize_factor = 1.0
-        self.canvas_zoom_factor = 1.0
         self.current_canvas_scale = 1.0
-        self.pan_x = 0
-        self.pan_y = 0
         self.dragging = False
         self.drag_start_x = 0
         self.drag_start_y = 0
-        self.grid_color = "red"
         self.drawn_lines = []
+        self.grid_geometry = None
+        # Grid cell under the mouse pointer, shown at the right of the status bar
+        self.hover_cell = None
+        # Size, mtime and hash of the source when the project was last saved or opened
+        self.source_fingerprint = None
 
         self.image_processor = ImageProcessor()
         self.grid_renderer = GridRenderer()
-        self.grid_exporter = GridExporter()
+        # Created on first export; loading it pulls in fonts and the export writers
+        self._grid_exporter = None
+        # Exports run one at a time on a worker thread; Esc cancels the running one
+        self.export_queue = ExportQueue()
+        self.export_message = None
+        # Whether a check_exports loop is already scheduled
+        self.export_polling = False
+        self.redraw_scheduler = RedrawScheduler(root, self.update_grid)
+        # Frame timing HUD: F12 toggles it, F11 dumps the stats, Shift+F12 records a cProfile
+        self.profiler = FrameProfiler(enabled=os.environ.get('ARTGRID_PROFILE') == '1')
+        self.hud_updated = 0.0
 
         callbacks = {
             'load_image': self.load_image,
+            'open_project': self.open_project,
+            'save_project': self.save_project,
             'reset_view': self.reset_view,
             'export_image': self.export_image,
+            'cancel_export': self.cancel_export,
             'choose_color': self.choose_color,
             'adjust_grid_size': self.adjust_grid_size,
             'adjust_thickness': self.adjust_thickness,
             'update_grid': self.update_grid,
+            'schedule_redraw': self.redraw_scheduler.request,
             'start_drag': self.start_drag,
             'drag': self.drag,
             'end_drag': self.end_drag,
             'mouse_resize': self.mouse_resize,
+            'hover': self.show_hover_cell,
+            'leave': self.clear_hover_cell,
             'adjust_canvas_zoom': self.adjust_canvas_zoom,
             'update_canvas_zoom': self.update_canvas_zoom
         }
 
+        # Only the buttons exist at first; the other panels are built once the window shows
         self.controls = ControlPanels(root, callbacks)
         self.canvas_widget = ImageCanvas(root, callbacks)
-
+        self.tile_renderer = TileRenderer(root, self.canvas_widget.canvas, self.image_processor,
+                                          profiler=self.profiler)
+        self.root.bind('<F12>', self.toggle_profiler)
+        self.root.bind('<F11>', self.dump_profile)
+        self.root.bind('<Shift-F12>', self.toggle_profile_capture)
+        self.root.bind('<Control-z>', self.undo_view)
+        self.root.bind('<Control-y>', self.redo_view)
+        self.root.bind('<Control-Shift-Z>', self.redo_view)
+        self.root.bind('<Escape>', self.cancel_export)
+        self.map_binding = self.root.bind('<Map>', self.on_first_map, add='+')
+        self.root.protocol('WM_DELETE_WINDOW', self.on_close)
+
+        status_bar = Frame(root)
+        status_bar.pack(side=tk.BOTTOM, fill=tk.X)
+        self.cell_label = Label(status_bar, text="", bd=1, relief=tk.SUNKEN, anchor=tk.W, width=22)
+        self.cell_label.pack(side=tk.RIGHT)
         self.status_label = Label(
-            root, text="Ready. Please load an image.", bd=1, relief=tk.SUNKEN, anchor=tk.W)
-        self.status_label.pack(side=tk.BOTTOM, fill=tk.X)
+            status_bar, text="Ready. Please load an image.", bd=1, relief=tk.SUNKEN, anchor=tk.W)
+        self.status_label.pack(side=tk.LEFT, fill=tk.X, expand=True)
+
 
 
+    @property
+    def grid_exporter(self):
+        if self._grid_exporter is None:
+            from src.utils.grid_export import GridExporter
+            self._grid_exporter = GridExporter()
+        return self._grid_exporter
+
+    def on_first_map(self, event):
+        if event.widget is not self.root:
+            return
+        self.root.unbind('<Map>', self.map_binding)
+        self.root.after(SECONDARY_PANEL_DELAY_MS, self.controls.build_secondary_panels)
 
     def calculate_resize_factor(self):
         """Calculate the resize factor based on user's target dimensions"""
@@ -70,10 +152,10 @@ class ArtGridApp:
             dimension = self.controls.resize_dimension.get()
             
             # Convert target to pixels
-            target_pixels = UnitConverter.to_pixels(target_value, target_unit)
+            target_pixels = UnitConverter.for_dpi(self.current_dpi()).to_pixels(target_value, target_unit)
             
             # Get current image dimensions
-            original_width, original_height = self.image_processor.original_image.size
+            original_width, original_height = self.image_processor.source.size
             
             if dimension == 'width':
                 resize_factor = target_pixels / original_width
@@ -85,18 +167,161 @@ class ArtGridApp:
         except (ValueError, AttributeError, ZeroDivisionError):
             return 1.0
 
+    def current_dpi(self):
+        """DPI from the DPI control, or the last valid one while it is being edited"""
+        try:
+            dpi = int(float(self.controls.dpi_value.get()))
+        except (ValueError, TypeError):
+            return self.view.dpi
+        return dpi if dpi > 0 else self.view.dpi
+
+    @property
+    def unit_converter(self):
+        return UnitConverter.for_dpi(self.view.dpi)
+
     def load_image(self):
         file_path = filedialog.askopenfilename(
-            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.gif")]
+            filetypes=[("Image files", "*.jpg *.jpeg *.png *.bmp *.gif *.tif *.tiff"),
+                       ("Raw pixels (size in name)", "*.raw *.rgb *.rgba *.gray")]
         )
         
         if not file_path:
             return
         
-        if self.image_processor.load_image(file_path):
+        # Large JPEGs show a reduced preview first and decode fully in the background
+        preview_size = (self.canvas_widget.canvas.winfo_width(), self.canvas_widget.canvas.winfo_height())
+        if self.image_processor.load_image(file_path, preview_size):
+            self.tile_renderer.reset()
+            self.rendered_view = None
+            self.history.clear()
+            self.source_fingerprint = None
+            # Each image brings its own print resolution when the file records one
+            dpi = UnitConverter.dpi_from_info(self.image_processor.source.info, UnitConverter.DEFAULT_DPI)
+            self.controls.dpi_value.set(str(dpi))
             info = self.image_processor.get_image_info()
             self.status_label.config(text=f"Loaded: {info['filename']}")
             self.reset_view()
+            if self.image_processor.loading:
+                self.root.after(50, self.check_full_image)
+
+    def open_project(self):
+        file_path = filedialog.askopenfilename(
+            filetypes=[("Art Grid projects", "*" + PROJECT_EXTENSION)]
+        )
+        if not file_path:
+            return
+
+        try:
+            project = load_project(file_path)
+        except (OSError, ValueError, KeyError) as e:
+            self.status_label.config(text=f"Could not open project: {e}")
+            return
+
+        # A valid pyramid cache is shown at once; the full image decodes in the background
+        preview_size = (self.canvas_widget.canvas.winfo_width(), self.canvas_widget.canvas.winfo_height())
+        if not self.image_processor.load_image(project['image_path'], preview_size,
+                                               project['cached_levels']):
+            for _, level in project['cached_levels'] or ():
+                level.close()
+            self.status_label.config(text=f"Could not load image: {project['image_path']}")
+            return
+        self.tile_renderer.reset()
+        self.rendered_view = None
+        self.history.clear()
+        self.source_fingerprint = project['source']
+
+        settings = project['settings']
+        resize = settings.get('resize', {})
+        self.controls.resize_enabled.set(1 if resize.get('enabled') else 0)
+        self.controls.resize_value.set(resize.get('value', self.controls.resize_value.get()))
+        self.controls.resize_unit.set(resize.get('unit', self.controls.resize_unit.get()))
+        self.controls.resize_dimension.set(resize.get('dimension', self.controls.resize_dimension.get()))
+        self.controls.dpi_value.set(str(settings.get('dpi', UnitConverter.DEFAULT_DPI)))
+
+        grid = settings.get('grid', {})
+        view = settings.get('view', {})
+        self.apply_view_state(self.view._replace(
+            grid_size=grid.get('size', self.grid_size),
+            grid_unit=grid.get('unit', self.view.grid_unit),
+            line_thickness=grid.get('thickness', self.line_thickness),
+            grid_color=grid.get('color', self.grid_color),
+            pan_x=view.get('pan_x', 0),
+            pan_y=view.get('pan_y', 0),
+            canvas_zoom_factor=view.get('canvas_zoom_factor', 1.0)))
+
+        cache_note = "cached preview" if project['cached_levels'] else "no valid cache, rebuilding"
+        self.status_label.config(text=f"Opened project: {os.path.basename(file_path)} ({cache_note})")
+        if self.image_processor.loading:
+            self.root.after(50, self.check_full_image)
+
+    def project_settings(self):
+        return {
+            'grid': {
+                'size': self.grid_size,
+                'unit': self.controls.grid_unit.get(),
+                'thickness': self.line_thickness,
+                'color': self.grid_color,
+            },
+            'resize': {
+                'enabled': bool(self.controls.resize_enabled.get()),
+                'value': self.controls.resize_value.get(),
+                'unit': self.controls.resize_unit.get(),
+                'dimension': self.controls.resize_dimension.get(),
+            },
+            'dpi': self.current_dpi(),
+            'view': {
+                'pan_x': self.pan_x,
+                'pan_y': self.pan_y,
+                'canvas_zoom_factor': self.canvas_zoom_factor,
+            },
+        }
+
+    def save_project(self):
+        if self.image_processor.source is None:
+            self.status_label.config(text="No image loaded to save in a project")
+            return
+
+        file_path = filedialog.asksaveasfilename(
+            defaultextension=PROJECT_EXTENSION,
+            filetypes=[("Art Grid projects", "*" + PROJECT_EXTENSION)]
+        )
+        if not file_path:
+            return
+
+        # Cache the finished pyramid, not a draft preview
+        self.image_processor.get_loaded_source()
+        self.poll_full_image()
+        self.image_processor.get_pyramid()
+
+        try:
+            self.source_fingerprint = save_project(
+                file_path, self.image_processor.image_path, self.project_settings(),
+                self.image_processor.pyramid, self.source_fingerprint, self.release_cache)
+        except (OSError, ValueError) as e:
+            self.status_label.config(text=f"Could not save project: {e}")
+            return
+        self.status_label.config(text=f"Saved project: {file_path}")
+
+    def release_cache(self, cache_dir):
+        """Stop reading preview levels from cache_dir so save_project can replace it"""
+        if self.image_processor.release_cached_levels(cache_dir):
+            self.tile_renderer.reset()
+            self.rendered_view = None
+            self.redraw_scheduler.request()
+
+    def poll_full_image(self):
+        """Redraw from the full resolution image if it was just swapped in; True if so"""
+        if not self.image_processor.poll_full_image():
+            return False
+        self.tile_renderer.reset()
+        self.rendered_view = None
+        self.redraw_scheduler.flush()
+        return True
+
+    def check_full_image(self):
+        """Redraw from the full resolution image once its background decode is done"""
+        if not self.poll_full_image() and self.image_processor.loading:
+            self.root.after(50, self.check_full_image)
 
     def choose_color(self):
         color = colorchooser.askcolor(initialcolor=self.grid_color,
@@ -118,29 +343,30 @@ class ArtGridApp:
         else:  # px
             increment = amount
             
-        new_value = self.controls.grid_size_scale.get() + increment
+        new_value = self.controls.grid_size_value.get() + increment
         if 0.1 <= new_value <= 50:
-            self.controls.grid_size_scale.set(new_value)
+            self.controls.grid_size_value.set(new_value)
             self.grid_size = new_value
-            self.update_grid()
+            self.redraw_scheduler.request()
 
     def adjust_thickness(self, amount):
-        new_value = self.controls.thickness_scale.get() + amount
+        new_value = self.controls.thickness_value.get() + amount
         if 1 <= new_value <= 10:
-            self.controls.thickness_scale.set(new_value)
+            self.controls.thickness_value.set(new_value)
             self.line_thickness = new_value
-            self.update_grid()
+            self.redraw_scheduler.request()
 
     def adjust_image_resize(self, amount):
-        new_value = self.controls.canvas_zoom_scale.get() + amount
+        new_value = self.controls.canvas_zoom_value.get() + amount
         if 0.1 <= new_value <= 10:
-            self.controls.canvas_zoom_scale.set(new_value)
+            self.controls.canvas_zoom_value.set(new_value)
             self.image_resize_factor = new_value
             self.update_grid()
 
     def reset_view(self):
         self.image_resize_factor = 1.0
-        self.controls.canvas_zoom_scale.set(1.0)
+        self.canvas_zoom_factor = 1.0
+        self.controls.canvas_zoom_value.set(1.0)
         self.pan_x = 0
         self.pan_y = 0
         # Reset image resize controls
@@ -148,19 +374,23 @@ class ArtGridApp:
         self.update_grid()
 
     def update_image_resize(self, _=None):
-        self.image_resize_factor = float(self.controls.canvas_zoom_scale.get())
+        self.image_resize_factor = float(self.controls.canvas_zoom_value.get())
         self.update_grid()
 
     def adjust_canvas_zoom(self, amount):
-        new_value = self.controls.canvas_zoom_scale.get() + amount
+        new_value = self.controls.canvas_zoom_value.get() + amount
         if 0.1 <= new_value <= 10:
-            self.controls.canvas_zoom_scale.set(new_value)
+            self.controls.canvas_zoom_value.set(new_value)
             self.canvas_zoom_factor = new_value
             self.update_grid()
 
     def update_canvas_zoom(self, _=None):
-        self.canvas_zoom_factor = float(self.controls.canvas_zoom_scale.get())
-        self.update_grid()
+        zoom = float(self.controls.canvas_zoom_value.get())
+        # Setting the slider from code lands here too; keep a finer zoom on the same notch
+        if abs(zoom - self.canvas_zoom_factor) < 0.05:
+            return
+        self.canvas_zoom_factor = zoom
+        self.redraw_scheduler.request()
 
     def mouse_resize(self, event):
         x, y = self.canvas_widget.canvas.canvasx(event.x), self.canvas_widget.canvas.canvasy(event.y)
@@ -179,9 +409,9 @@ class ArtGridApp:
             self.pan_y = y - (y - self.pan_y) * zoom_factor
 
             self.canvas_zoom_factor = new_zoom
-            self.controls.canvas_zoom_scale.set(new_zoom)
+            self.controls.canvas_zoom_value.set(new_zoom)
 
-            self.update_grid()
+            self.redraw_scheduler.request()
 
     def start_drag(self, event):
         self.dragging = True
@@ -201,61 +431,100 @@ class ArtGridApp:
         self.pan_x += dx
         self.pan_y += dy
 
-        self.update_grid()
+        with self.profiler.frame(), self.profiler.phase('pan'):
+            # Panning translates the existing canvas items instead of redrawing them
+            if self.grid_renderer.pan(self.canvas_widget.canvas, dx, dy):
+                # The grid is only drawn a margin past the view, so refill it
+                self.redraw_scheduler.defer(self.draw_canvas_grid)
+            self.tile_renderer.pan(dx, dy)
+            if self.rendered_view is not None:
+                self.rendered_view = self.rendered_view._replace(pan_x=self.pan_x, pan_y=self.pan_y)
+        # Newly exposed tiles are picked up at most once per frame
+        self.redraw_scheduler.defer(self.tile_renderer.refresh)
+        self.update_profiler_hud()
 
     def end_drag(self, event):
         self.dragging = False
+        self.history.record(self.view)
 
     
 
-    def update_grid(self, _=None):
-        if self.image_processor.original_image is None:
-            return
-
-        # Get the current unit
-        current_unit = self.controls.grid_unit.get()
+    def update_grid(self, _=None, resample=Image.LANCZOS):
+        with self.profiler.frame():
+            self.redraw_view(resample)
+        self.update_profiler_hud()
+        # Settled states become undo steps; previews and drags in progress do not
+        if resample == Image.LANCZOS and not self.dragging and self.rendered_view is not None:
+            self.history.record(self.view)
+
+    def undo_view(self, _=None):
+        state = self.history.undo()
+        if state is not None:
+            self.apply_view_state(state)
+
+    def redo_view(self, _=None):
+        state = self.history.redo()
+        if state is not None:
+            self.apply_view_state(state)
+
+    def apply_view_state(self, state):
+        """Restore the undoable parts of a recorded view and the controls showing them"""
+        self.view = self.view._replace(**{field: getattr(state, field) for field in UNDO_FIELDS})
+        self.controls.grid_unit.set(state.grid_unit)
+        self.controls.grid_size_value.set(state.grid_size)
+        self.controls.thickness_value.set(state.line_thickness)
+        self.controls.canvas_zoom_value.set(state.canvas_zoom_factor)
+        self.update_grid()
 
-        # Manual size mode: use square grid controls
-        self.grid_size = self.controls.grid_size_scale.get()
-        # Convert grid size to pixels
-        grid_width = int(UnitConverter.to_pixels(self.grid_size, current_unit))
-        grid_height = int(UnitConverter.to_pixels(self.grid_size, current_unit))
+    def redraw_view(self, resample=Image.LANCZOS):
+        """Bring the canvas up to date with self.view, redoing only what changed.
 
-        self.line_thickness = self.controls.thickness_scale.get()
+        Zoom, resize or canvas size changes resample the image; a pan only
+        translates items; grid size, unit or thickness changes redraw the
+        grid without touching the image; a color change recolors the lines.
+        """
+        if self.image_processor.source is None:
+            return
 
-        canvas_width = self.canvas_widget.canvas.winfo_width()
-        canvas_height = self.canvas_widget.canvas.winfo_height()
+        canvas = self.canvas_widget.canvas
+        canvas_width = canvas.winfo_width()
+        canvas_height = canvas.winfo_height()
 
         if canvas_width <= 1:
             self.root.after(100, self.update_grid)
             return
 
-        # Calculate resize factor based on user input
-        target_resize_factor = self.calculate_resize_factor()
-        displayed_image, original_scaled_width, original_scaled_height = self.image_processor.resize_image(target_resize_factor)
-        
+        # Pick up the slider and resize control values; handlers set the rest
+        self.view = self.view._replace(
+            grid_size=self.controls.grid_size_value.get(),
+            grid_unit=self.controls.grid_unit.get(),
+            line_thickness=self.controls.thickness_value.get(),
+            resize_factor=self.calculate_resize_factor(),
+            dpi=self.current_dpi())
+        view, previous = self.view, self.rendered_view
+        changes = changed_fields(previous, view)
+        if (canvas_width, canvas_height) != self.rendered_canvas_size:
+            changes |= IMAGE_FIELDS
+
+        # Convert grid size to pixels; kept fractional so physical sizes do not drift
+        grid_width = grid_height = self.unit_converter.to_pixels(view.grid_size, view.grid_unit)
+
+        original_width, original_height = self.image_processor.source.size
+        original_scaled_width = int(original_width * view.resize_factor)
+        original_scaled_height = int(original_height * view.resize_factor)
+
         # Apply canvas zoom to the image
-        scaled_width = int(original_scaled_width * self.canvas_zoom_factor)
-        scaled_height = int(original_scaled_height * self.canvas_zoom_factor)
-        
-        # Resize the displayed image based on canvas zoom
-        if displayed_image:
-            displayed_image = displayed_image.resize((scaled_width, scaled_height), Image.LANCZOS)
-            self.canvas_widget.canvas.image = ImageTk.PhotoImage(displayed_image) # Keep a reference!
-            displayed_image = self.canvas_widget.canvas.image
-
-        self.canvas_widget.canvas.delete("image_tag")
-        self.canvas_widget.canvas.delete("grid_tag")
-        self.canvas_widget.canvas.delete("coordinate_tag")
-        # Preserve drawn lines by not deleting them here
-        for line_id in self.drawn_lines:
-            self.canvas_widget.canvas.tag_raise(line_id)
+        scaled_width = int(original_scaled_width * view.canvas_zoom_factor)
+        scaled_height = int(original_scaled_height * view.canvas_zoom_factor)
 
-        img_x = canvas_width//2 - scaled_width//2 + self.pan_x
-        img_y = canvas_height//2 - scaled_height//2 + self.pan_y
+        img_x = canvas_width//2 - scaled_width//2 + view.pan_x
+        img_y = canvas_height//2 - scaled_height//2 + view.pan_y
 
-        if displayed_image:
-            self.canvas_widget.canvas.create_image(img_x, img_y, image=displayed_image, anchor=tk.NW, tags="image_tag")
+        # Visible tiles are rendered in the background and shown as they finish
+        if changes & (IMAGE_FIELDS | PAN_FIELDS) or resample != self.rendered_resample:
+            with self.profiler.phase('tiles'):
+                self.tile_renderer.render(scaled_width, scaled_height, img_x, img_y,
+                                          canvas_width, canvas_height, resample)
 
         # Grid size should remain constant in actual units, not scaled with image
         scaled_grid_width = grid_width
@@ -266,37 +535,53 @@ class ArtGridApp:
         if scaled_grid_height < 5:
             scaled_grid_height = 5
 
-        self.grid_renderer.draw_grid_on_canvas(
-            self.canvas_widget.canvas, img_x, img_y, original_scaled_width, original_scaled_height,
-            scaled_grid_width, scaled_grid_height, self.line_thickness, self.grid_color, self.canvas_zoom_factor
-        )
-        
-        self.grid_renderer.draw_coordinates_on_canvas(
-            self.canvas_widget.canvas, img_x, img_y, original_scaled_width, original_scaled_height,
-            scaled_grid_width, scaled_grid_height, self.canvas_zoom_factor
-        )
+        # Kept relative to the pan so a drag can redraw the grid on its own; the
+        # layout is shared and only rebuilt when the image size or grid changes
+        self.grid_geometry = (img_x - view.pan_x, img_y - view.pan_y,
+                              GridLayout.for_grid(original_scaled_width, original_scaled_height,
+                                                  scaled_grid_width, scaled_grid_height))
+        if changes & (IMAGE_FIELDS | GRID_FIELDS):
+            self.draw_canvas_grid()
+        else:
+            if changes & PAN_FIELDS:
+                if self.grid_renderer.pan(canvas, view.pan_x - previous.pan_x, view.pan_y - previous.pan_y):
+                    self.draw_canvas_grid()
+            if changes & COLOR_FIELDS and not self.grid_renderer.recolor(canvas, view.grid_color):
+                self.draw_canvas_grid()
+        # Preserve drawn lines by keeping them above the grid
+        for line_id in self.drawn_lines:
+            canvas.tag_raise(line_id)
+
+        if changes & (IMAGE_FIELDS | {'dpi'}):
+            with self.profiler.phase('status'):
+                self.update_status()
 
+        self.rendered_view = view
+        self.rendered_canvas_size = (canvas_width, canvas_height)
+        self.rendered_resample = resample
+
+    def update_status(self):
+        """Show file name, zoom and image size in every unit in the status bar"""
         info = self.image_processor.get_image_info()
         
         # Create image size tooltip with all units
         size_info = ""
-        if info and self.image_processor.original_image:
-            original_width, original_height = self.image_processor.original_image.size
+        if info and self.image_processor.source:
+            original_width, original_height = self.image_processor.source.size
             
             # Get resized dimensions if resize is enabled
             target_resize_factor = self.calculate_resize_factor()
             current_width = int(original_width * target_resize_factor)
             current_height = int(original_height * target_resize_factor)
             
-            # Convert to all units
+            # Convert to all units at the document's DPI
+            per_pixel = self.unit_converter.units_per_pixel
+
             def format_size_all_units(width_px, height_px):
-                cm_w = UnitConverter.from_pixels(width_px, 'cm')
-                cm_h = UnitConverter.from_pixels(height_px, 'cm')
-                mm_w = UnitConverter.from_pixels(width_px, 'mm')
-                mm_h = UnitConverter.from_pixels(height_px, 'mm')
-                inch_w = UnitConverter.from_pixels(width_px, 'inch')
-                inch_h = UnitConverter.from_pixels(height_px, 'inch')
-                
+                cm_w, cm_h = width_px * per_pixel['cm'], height_px * per_pixel['cm']
+                mm_w, mm_h = width_px * per_pixel['mm'], height_px * per_pixel['mm']
+                inch_w, inch_h = width_px * per_pixel['inch'], height_px * per_pixel['inch']
+
                 return f"{width_px}×{height_px}px | {cm_w:.1f}×{cm_h:.1f}cm | {mm_w:.0f}×{mm_h:.0f}mm | {inch_w:.2f}×{inch_h:.2f}in"
             
             if target_resize_factor != 1.0:
@@ -305,7 +590,7 @@ class ArtGridApp:
                 size_info = f"Size: {format_size_all_units(original_width, original_height)}"
         
         # Add canvas zoom info
-        zoom_info = f"Canvas Zoom: {self.canvas_zoom_factor:.1f}x"
+        zoom_info = f"Canvas Zoom: {self.canvas_zoom_factor:.1f}x | {self.view.dpi} DPI"
         
         # Build status message
         filename = info['filename'] if info else 'None'
@@ -314,15 +599,92 @@ class ArtGridApp:
         else:
             self.status_label.config(text=f"Loaded: {filename} | {zoom_info}")
 
+    def draw_canvas_grid(self):
+        """Update the pooled grid and label items for the current view"""
+        if self.grid_geometry is None:
+            return
+        base_x, base_y, layout = self.grid_geometry
+        canvas = self.canvas_widget.canvas
+        img_x, img_y = base_x + self.pan_x, base_y + self.pan_y
+        view_width, view_height = canvas.winfo_width(), canvas.winfo_height()
+
+        with self.profiler.phase('grid'):
+            self.grid_renderer.draw_grid_on_canvas(
+                canvas, img_x, img_y, layout, self.line_thickness, self.grid_color, self.canvas_zoom_factor,
+                view_width, view_height
+            )
+        with self.profiler.phase('labels'):
+            self.grid_renderer.draw_coordinates_on_canvas(
+                canvas, img_x, img_y, layout, self.canvas_zoom_factor, view_width, view_height
+            )
+
+    def show_hover_cell(self, event):
+        """Show the column and row of the grid cell under the mouse pointer"""
+        cell = None
+        if self.grid_geometry is not None and self.image_processor.source is not None:
+            base_x, base_y, layout = self.grid_geometry
+            canvas = self.canvas_widget.canvas
+            # Back from canvas to picture pixels, the space the grid layout is in
+            cell = layout.cell_at((canvas.canvasx(event.x) - base_x - self.pan_x) / self.canvas_zoom_factor,
+                                  (canvas.canvasy(event.y) - base_y - self.pan_y) / self.canvas_zoom_factor)
+        # Motion events come in fast; the label only changes when the pointer enters another cell
+        if cell != self.hover_cell:
+            self.hover_cell = cell
+            self.cell_label.config(text="" if cell is None else f"Column {cell[0] + 1}, Row {cell[1] + 1}")
+
+    def clear_hover_cell(self, _=None):
+        if self.hover_cell is not None:
+            self.hover_cell = None
+            self.cell_label.config(text="")
+
+    def toggle_profiler(self, _=None):
+        self.profiler.enabled = not self.profiler.enabled
+        self.profiler.reset()
+        if not self.profiler.enabled:
+            self.canvas_widget.canvas.delete("profiler_hud")
+        self.update_profiler_hud(force=True)
+
+    def update_profiler_hud(self, force=False):
+        """Refresh the FPS / worst phase readout, at most a few times a second"""
+        if not self.profiler.enabled:
+            return
+        now = time.perf_counter()
+        if not force and now - self.hud_updated < HUD_INTERVAL:
+            return
+        self.hud_updated = now
+
+        canvas = self.canvas_widget.canvas
+        text = self.profiler.summary()
+        if canvas.find_withtag("profiler_hud"):
+            canvas.itemconfig("profiler_hud", text=text)
+        else:
+            canvas.create_text(8, 8, text=text, anchor=tk.NW, fill="black",
+                               font=("Courier", 9), tags="profiler_hud")
+        canvas.tag_raise("profiler_hud")
+
+    def dump_profile(self, _=None):
+        file_path = os.path.abspath(time.strftime("artgrid_profile_%Y%m%d_%H%M%S.json"))
+        self.profiler.dump(file_path)
+        self.status_label.config(text=f"Frame statistics written to: {file_path}")
+
+    def toggle_profile_capture(self, _=None):
+        file_path = os.path.abspath(time.strftime("artgrid_%Y%m%d_%H%M%S.prof"))
+        if self.profiler.toggle_capture(file_path):
+            self.status_label.config(text="cProfile capture started (Shift+F12 to stop)")
+        else:
+            self.status_label.config(text=f"cProfile capture written to: {file_path}")
+        self.update_profiler_hud(force=True)
+
     def export_image(self):
-        if self.image_processor.original_image is None:
+        if self.image_processor.source is None:
             self.status_label.config(text="No image loaded to export")
             return
 
         file_path = filedialog.asksaveasfilename(
             defaultextension=".png",
-            filetypes=[("PNG files", "*.png"),
-                       ("JPEG files", "*.jpg"), ("All files", "*.*")]
+            filetypes=[("PNG files", "*.png"), ("JPEG files", "*.jpg"),
+                       ("TIFF files", "*.tif"), ("PDF files", "*.pdf"),
+                       ("SVG with vector grid", "*.svg"), ("All files", "*.*")]
         )
 
         if not file_path:
@@ -330,21 +692,96 @@ class ArtGridApp:
 
         # Calculate grid dimensions for export (manual size mode)
         current_unit = self.controls.grid_unit.get()
-        grid_width = int(UnitConverter.to_pixels(self.grid_size, current_unit))
-        grid_height = int(UnitConverter.to_pixels(self.grid_size, current_unit))
+        dpi = self.current_dpi()
+        grid_width = grid_height = UnitConverter.for_dpi(dpi).to_pixels(self.grid_size, current_unit)
 
         # Use the resize factor for export (canvas zoom is display-only)
         target_resize_factor = self.calculate_resize_factor()
-        dpi = UnitConverter.DEFAULT_DPI
-        success = self.grid_exporter.export_image_with_grid(
-            self.image_processor.original_image, file_path, grid_width, grid_height,
-            self.line_thickness, self.grid_color, target_resize_factor, dpi
-        )
-        
-        if success:
-            self.status_label.config(text=f"Exported image to: {file_path}")
+        # Very large PNG/TIFF exports are encoded strip by strip to bound memory
+        # Held open for the export even if another image is loaded meanwhile
+        source = self.image_processor.acquire_source()
+        if file_path.lower().endswith('.svg') or (
+                file_path.lower().endswith('.pdf') and self.controls.vector_pdf.get()):
+            # Picture embedded once, grid and labels as vector paths
+            export = self.grid_exporter.export_image_with_grid_vector
+        elif file_path.lower().endswith('.pdf'):
+            # Split into printable sheets of the chosen paper size
+            export = functools.partial(self.grid_exporter.export_image_with_grid_paged,
+                                       paper=self.controls.paper_size.get())
+        elif self.grid_exporter.should_stream(source, target_resize_factor, file_path):
+            export = self.grid_exporter.export_image_with_grid_streaming
+        else:
+            export = self.grid_exporter.export_image_with_grid
+        # A background decode of this image has to finish before its pixels are read
+        loader = self.image_processor.loader_thread
+        line_thickness, grid_color = self.line_thickness, self.grid_color
+
+        def task(job):
+            # Written next to the target and moved over it only once complete, so a
+            # cancelled or failed export neither truncates nor deletes an existing file
+            directory, name = os.path.split(file_path)
+            stem, extension = os.path.splitext(name)
+            partial_path = os.path.join(directory, f".{stem}.{os.getpid()}-{job.job_id}.part{extension}")
+            try:
+                if loader is not None:
+                    loader.join()
+                result = export(source, partial_path, grid_width, grid_height,
+                                line_thickness, grid_color, target_resize_factor, dpi,
+                                progress=job.report)
+                if result:
+                    os.replace(partial_path, file_path)
+                return result
+            finally:
+                if os.path.exists(partial_path):
+                    os.remove(partial_path)
+                self.image_processor.release_source(source)
+
+        self.export_queue.submit(os.path.basename(file_path), task)
+        if not self.export_polling:
+            self.export_polling = True
+            self.check_exports()
+
+    def cancel_export(self, _=None):
+        job = self.export_queue.cancel_current()
+        if job is None:
+            self.status_label.config(text="No export running")
+        else:
+            self.status_label.config(text=f"Cancelling export of {job.description}...")
+
+    def check_exports(self):
+        """Show export progress in the status bar while the export queue is busy"""
+        changed = self.export_queue.poll()
+        for job in changed:
+            if job.state == ExportJob.DONE:
+                self.export_message = f"Exported image to: {job.description}" if job.result else "Export failed"
+            elif job.state == ExportJob.FAILED:
+                self.export_message = f"Export of {job.description} failed: {job.error}"
+            elif job.state == ExportJob.CANCELLED:
+                self.export_message = f"Export of {job.description} cancelled"
+
+        if changed:
+            # The last finished export stays visible next to the progress of the running one
+            parts = [self.export_message] if self.export_message else []
+            job = self.export_queue.current
+            if job is not None and job.state == ExportJob.RUNNING and not job.cancelled:
+                stage = EXPORT_STAGE_NAMES.get(job.stage, "starting")
+                parts.append(f"Exporting {job.description}: {stage} {job.fraction:.0%} (Esc to cancel)")
+            queued = len(self.export_queue.pending())
+            if queued:
+                parts.append(f"{queued} export{'s' if queued > 1 else ''} queued")
+            self.status_label.config(text=" | ".join(parts))
+
+        if self.export_queue.busy:
+            self.root.after(EXPORT_POLL_MS, self.check_exports)
         else:
-            self.status_label.config(text="Export failed")
+            self.export_polling = False
+            self.export_message = None
+
+    def on_close(self):
+        """Cancel running and queued exports so they clean up, then close the window"""
+        self.export_queue.cancel_all()
+        self.export_queue.join(EXPORT_CLOSE_TIMEOUT)
+        self.root.destroy()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,222 @@
+"""Headless batch export: grid every image in a set of directories or globs.
+
+Usage:
+    python -m src.batch_export photos/ "scans/*.tif" -o gridded --grid-size 2 --unit cm
+
+This module must not import tkinter (directly or through src.ui) so that it
+runs on servers without a display.
+"""
+import argparse
+import functools
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from src.utils.grid_export import GridExporter, GridOverlayCache
+from src.utils.image_source import RAW_EXTENSIONS, open_image_source
+from src.utils.unit_converter import UnitConverter
+
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tif', '.tiff') + tuple(RAW_EXTENSIONS)
+
+# One exporter per worker process so fonts and label sprites are reused across files
+_exporter = None
+
+
+def collect_inputs(patterns):
+    """Expand directories and glob patterns into a sorted list of image files"""
+    paths = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            candidates = [os.path.join(pattern, name) for name in os.listdir(pattern)]
+        else:
+            candidates = glob.glob(pattern)
+        for path in candidates:
+            if os.path.isfile(path) and path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.add(os.path.abspath(path))
+    return sorted(paths)
+
+
+def calculate_resize_factor(image_size, resize_value, resize_unit, resize_dimension,
+                            dpi=UnitConverter.DEFAULT_DPI):
+    """Same rule as the GUI: scale so one dimension hits the target, clamped to 0.1x-10x"""
+    if resize_value is None:
+        return 1.0
+    target_pixels = UnitConverter.for_dpi(dpi).to_pixels(resize_value, resize_unit)
+    original = image_size[0] if resize_dimension == 'width' else image_size[1]
+    return max(0.1, min(10.0, target_pixels / original))
+
+
+def export_one(source_path, output_path, options):
+    """Grid a single image; runs inside a worker process"""
+    global _exporter
+    if _exporter is None:
+        _exporter = GridExporter(overlay_cache=GridOverlayCache() if options['reuse_overlay'] else None)
+    exporter = _exporter
+
+    # Uncompressed TIFFs are memory-mapped and read strip by strip
+    source = open_image_source(source_path)
+    try:
+        # Without --dpi every image is measured at the resolution it records
+        dpi = options['dpi'] or UnitConverter.dpi_from_info(source.info, UnitConverter.DEFAULT_DPI)
+        converter = UnitConverter.for_dpi(dpi)
+        grid_pixels = converter.to_pixels(options['grid_size'], options['unit'])
+        if grid_pixels < 1:
+            raise ValueError(f"Grid size {options['grid_size']}{options['unit']} is smaller than "
+                             f"one pixel at {dpi} DPI")
+        resize_factor = calculate_resize_factor(
+            source.size, options['resize_value'], options['resize_unit'], options['resize_dimension'], dpi)
+        if output_path.lower().endswith('.svg') or (output_path.lower().endswith('.pdf') and options['vector']):
+            export = exporter.export_image_with_grid_vector
+        elif output_path.lower().endswith('.pdf'):
+            export = functools.partial(exporter.export_image_with_grid_paged,
+                                       paper=options['paper'], workers=options['page_workers'])
+        elif options['stream'] or exporter.should_stream(source, resize_factor, output_path):
+            export = exporter.export_image_with_grid_streaming
+        else:
+            export = exporter.export_image_with_grid
+        export(
+            source, output_path, grid_pixels, grid_pixels,
+            options['thickness'], options['color'], resize_factor, dpi)
+    finally:
+        source.close()
+    return output_path
+
+
+def plan_outputs(sources, output_dir, suffix, extension):
+    """Map each source to its output path, keeping different sources apart.
+
+    Outputs keep the source's subdirectory below the common parent of all
+    sources, and sources in one directory that differ only by extension
+    (x.jpg, x.png) get it in their name (x_jpg_grid.png). Returns
+    (planned, collisions): a dict of source to output path, and the
+    sources that would still share an output with another one.
+    """
+    base = os.path.commonpath([os.path.dirname(path) for path in sources])
+    stems = {}
+    for path in sources:
+        relative_dir = os.path.relpath(os.path.dirname(path), base)
+        stem, source_extension = os.path.splitext(os.path.basename(path))
+        stems.setdefault((relative_dir, stem.lower()), []).append((path, stem, source_extension))
+
+    planned = {}
+    for (relative_dir, _), group in stems.items():
+        for path, stem, source_extension in group:
+            if len(group) > 1:
+                stem = f"{stem}_{source_extension[1:].lower()}"
+            planned[path] = os.path.normpath(os.path.join(output_dir, relative_dir, f"{stem}{suffix}{extension}"))
+
+    # Case-insensitive file systems would still merge names that differ only in case
+    owners = {}
+    for path, output in planned.items():
+        owners.setdefault(output.lower(), []).append(path)
+    collisions = [path for paths in owners.values() if len(paths) > 1 for path in paths]
+    return planned, collisions
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="python -m src.batch_export",
+        description="Export images with a grid overlay without opening the GUI.")
+    parser.add_argument('inputs', nargs='+', help="image files, directories or glob patterns")
+    parser.add_argument('-o', '--output-dir', required=True, help="directory for gridded images")
+    parser.add_argument('--grid-size', type=float, default=1.0, help="grid cell size (default 1.0)")
+    parser.add_argument('--unit', choices=UnitConverter.get_available_units(), default='cm',
+                        help="unit of --grid-size (default cm)")
+    parser.add_argument('--thickness', type=int, default=1, help="line thickness in pixels (default 1)")
+    parser.add_argument('--color', default='red', help="grid color name or #rrggbb (default red)")
+    parser.add_argument('--resize', type=float, dest='resize_value',
+                        help="resize so the chosen dimension has this size")
+    parser.add_argument('--resize-unit', choices=UnitConverter.get_available_units(), default='cm',
+                        help="unit of --resize (default cm)")
+    parser.add_argument('--resize-dimension', choices=['width', 'height'], default='width',
+                        help="dimension --resize applies to (default width)")
+    parser.add_argument('--dpi', type=int,
+                        help="DPI for cm/mm/inch sizes, also written to the exported files "
+                             f"(default: each image's own DPI, else {UnitConverter.DEFAULT_DPI})")
+    parser.add_argument('--format', choices=['png', 'jpg', 'tif', 'pdf', 'svg'], default='png',
+                        help="output format; pdf splits the image into printable pages, "
+                             "svg writes the grid as vectors (default png)")
+    parser.add_argument('--vector', action='store_true',
+                        help="with --format pdf, write one sheet with a vector grid instead of pages")
+    parser.add_argument('--paper', choices=list(GridExporter.PAPER_SIZES_MM), default='A4',
+                        help="page size for --format pdf (default A4)")
+    parser.add_argument('--stream', action='store_true',
+                        help="always encode PNG/TIFF output strip by strip to bound memory "
+                             "(done automatically for very large exports)")
+    parser.add_argument('--reuse-overlay', action='store_true',
+                        help="keep the grid and label layer between images; faster when all "
+                             "images have the same size, but holds a full-size layer per worker")
+    parser.add_argument('--suffix', default='_grid', help="appended to each output name (default _grid)")
+    parser.add_argument('-j', '--workers', type=int, default=os.cpu_count() or 1,
+                        help="worker processes (default: one per core)")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.dpi is not None and UnitConverter.for_dpi(args.dpi).to_pixels(args.grid_size, args.unit) < 1:
+        print(f"Grid size {args.grid_size}{args.unit} is smaller than one pixel", file=sys.stderr)
+        return 2
+
+    sources = collect_inputs(args.inputs)
+    if not sources:
+        print("No images found", file=sys.stderr)
+        return 2
+
+    if args.stream and args.format in ('jpg', 'pdf', 'svg'):
+        print("--stream needs PNG or TIFF output", file=sys.stderr)
+        return 2
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {
+        'grid_size': args.grid_size,
+        'unit': args.unit,
+        'thickness': args.thickness,
+        'color': args.color,
+        'resize_value': args.resize_value,
+        'resize_unit': args.resize_unit,
+        'resize_dimension': args.resize_dimension,
+        'dpi': args.dpi,
+        'stream': args.stream,
+        'paper': args.paper,
+        'vector': args.vector,
+        'reuse_overlay': args.reuse_overlay,
+        # Pages render on threads only when the files themselves are not spread over processes
+        'page_workers': 1 if args.workers > 1 and len(sources) > 1 else None,
+    }
+
+    planned, collisions = plan_outputs(sources, args.output_dir, args.suffix, '.' + args.format)
+    # Never let two workers write the same file; such inputs fail instead
+    failures = [(source, ValueError(f"output {planned[source]} would also be written by another input"))
+                for source in collisions]
+    for source, error in failures:
+        print(f"FAILED {source}: {error}", file=sys.stderr)
+
+    done = len(failures)
+    with ProcessPoolExecutor(max_workers=max(1, args.workers)) as executor:
+        futures = {}
+        for source in sources:
+            if source in collisions:
+                continue
+            os.makedirs(os.path.dirname(planned[source]), exist_ok=True)
+            futures[executor.submit(export_one, source, planned[source], options)] = source
+        for done, future in enumerate(as_completed(futures), done + 1):
+            source = futures[future]
+            try:
+                output = future.result()
+                print(f"[{done}/{len(sources)}] {source} -> {output}")
+            except Exception as e:
+                failures.append((source, e))
+                print(f"[{done}/{len(sources)}] FAILED {source}: {e}", file=sys.stderr)
+
+    print(f"Exported {len(sources) - len(failures)} of {len(sources)} images")
+    for source, error in failures:
+        print(f"  failed: {source}: {error}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
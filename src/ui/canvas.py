@@ -20,6 +20,10 @@ class ImageCanvas:
         self.canvas.bind("<ButtonPress-1>", self.callbacks['start_drag'])
         self.canvas.bind("<B1-Motion>", self.callbacks['drag'])
         self.canvas.bind("<ButtonRelease-1>", self.callbacks['end_drag'])
+
+        # Cell readout under the pointer
+        self.canvas.bind("<Motion>", self.callbacks['hover'])
+        self.canvas.bind("<Leave>", self.callbacks['leave'])
         
         # Mouse wheel bindings for zooming
         self.canvas.bind("<MouseWheel>", self.callbacks['mouse_resize'])
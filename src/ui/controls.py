@@ -1,5 +1,5 @@
 import tkinter as tk
-from tkinter import Scale, Label, Button, Frame, Radiobutton, IntVar, StringVar, Entry
+from tkinter import Scale, Label, Button, Frame, Radiobutton, DoubleVar, IntVar, StringVar, Entry
 from tkinter.ttk import Combobox
 
 
@@ -8,19 +8,39 @@ class ControlPanels:
         self.root = root
         self.callbacks = callbacks
         self.grid_unit = StringVar(value='px')
+        # Slider values; they exist before the sliders, which bind to them once built
+        self.grid_size_value = DoubleVar(value=1.0)
+        self.thickness_value = IntVar(value=1)
+        self.canvas_zoom_value = DoubleVar(value=1.0)
         
         # Image resize controls
         self.resize_enabled = IntVar(value=0)
         self.resize_dimension = StringVar(value='width')  # 'width' or 'height'
         self.resize_value = StringVar(value='10.0')
         self.resize_unit = StringVar(value='cm')
-
+        # Print resolution of the document; set from the image when it is loaded
+        self.dpi_value = StringVar(value='96')
+        # Sheet size for PDF exports, which are split into printable pages
+        self.paper_size = StringVar(value='A4')
+        # PDF export as one sheet with a vector grid instead of printable pages
+        self.vector_pdf = IntVar(value=0)
+
+        self.secondary_built = False
         self.create_grid_controls(root)
 
     def create_grid_controls(self, parent_frame):
         self.create_control_frame(parent_frame)
-        self.create_image_resize_frame(parent_frame)
-        self.create_slider_frame(parent_frame)
+        # Holds the resize and slider panels, which build_secondary_panels adds after startup
+        self.secondary_frame = Frame(parent_frame)
+        self.secondary_frame.pack(side=tk.TOP, fill=tk.X)
+
+    def build_secondary_panels(self):
+        """Create the resize and slider panels; later calls do nothing"""
+        if self.secondary_built:
+            return
+        self.secondary_built = True
+        self.create_image_resize_frame(self.secondary_frame)
+        self.create_slider_frame(self.secondary_frame)
 
     def create_control_frame(self, parent_frame):
         self.control_frame = Frame(parent_frame)
@@ -28,10 +48,16 @@ class ControlPanels:
 
         Button(self.control_frame, text="Load Image",
             command=self.callbacks['load_image']).pack(side=tk.LEFT, padx=5)
+        Button(self.control_frame, text="Open Project",
+            command=self.callbacks['open_project']).pack(side=tk.LEFT, padx=5)
+        Button(self.control_frame, text="Save Project",
+            command=self.callbacks['save_project']).pack(side=tk.LEFT, padx=5)
         Button(self.control_frame, text="Reset View",
             command=self.callbacks['reset_view']).pack(side=tk.LEFT, padx=5)
         Button(self.control_frame, text="Export",
             command=self.callbacks['export_image']).pack(side=tk.LEFT, padx=5)
+        Button(self.control_frame, text="Cancel Export",
+            command=self.callbacks['cancel_export']).pack(side=tk.LEFT, padx=5)
         Button(self.control_frame, text="Grid Color",
             command=self.callbacks['choose_color']).pack(side=tk.LEFT, padx=5)
 
@@ -63,6 +89,22 @@ class ControlPanels:
         self.resize_unit_combo.pack(side=tk.LEFT, padx=5)
         self.resize_unit_combo.bind('<<ComboboxSelected>>', self.callbacks['update_grid'])
 
+        # DPI used to convert cm/mm/inch to pixels and written to exports
+        Label(self.image_resize_frame, text="DPI:").pack(side=tk.LEFT, padx=(15, 5))
+        self.dpi_combo = Combobox(self.image_resize_frame, textvariable=self.dpi_value,
+                                  values=['72', '96', '150', '300', '600'], width=6)
+        self.dpi_combo.pack(side=tk.LEFT, padx=5)
+        self.dpi_combo.bind('<<ComboboxSelected>>', self.callbacks['update_grid'])
+        self.dpi_combo.bind('<Return>', self.callbacks['update_grid'])
+        self.dpi_combo.bind('<FocusOut>', self.callbacks['update_grid'])
+
+        # Paper for paged PDF export
+        Label(self.image_resize_frame, text="PDF Paper:").pack(side=tk.LEFT, padx=(15, 5))
+        self.paper_combo = Combobox(self.image_resize_frame, textvariable=self.paper_size,
+                                    values=['A4', 'A3', 'Letter', 'Legal'], state='readonly', width=7)
+        self.paper_combo.pack(side=tk.LEFT, padx=5)
+        tk.Checkbutton(self.image_resize_frame, text="Vector PDF (one sheet)",
+                       variable=self.vector_pdf).pack(side=tk.LEFT, padx=5)
 
 
     def create_slider_frame(self, parent_frame):
@@ -97,8 +139,8 @@ class ControlPanels:
         Button(grid_control_frame, text="-",
             command=lambda: self.callbacks['adjust_grid_size'](-1)).pack(side=tk.LEFT)
         self.grid_size_scale = Scale(grid_control_frame, from_=0.1, to=50, orient=tk.HORIZONTAL,
-                                    length=150, command=self.callbacks['update_grid'], resolution=0.1)
-        self.grid_size_scale.set(1.0)
+                                    length=150, command=self.callbacks['schedule_redraw'], resolution=0.1,
+                                    variable=self.grid_size_value)
         self.grid_size_scale.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         Button(grid_control_frame, text="+",
             command=lambda: self.callbacks['adjust_grid_size'](1)).pack(side=tk.LEFT)
@@ -116,8 +158,8 @@ class ControlPanels:
         Button(thickness_control_frame, text="-",
             command=lambda: self.callbacks['adjust_thickness'](-1)).pack(side=tk.LEFT)
         self.thickness_scale = Scale(thickness_control_frame, from_=1, to=10, orient=tk.HORIZONTAL,
-                                    length=150, command=self.callbacks['update_grid'])
-        self.thickness_scale.set(1)
+                                    length=150, command=self.callbacks['schedule_redraw'],
+                                    variable=self.thickness_value)
         self.thickness_scale.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         Button(thickness_control_frame, text="+",
             command=lambda: self.callbacks['adjust_thickness'](1)).pack(side=tk.LEFT)
@@ -136,8 +178,8 @@ class ControlPanels:
         Button(canvas_zoom_control_frame, text="-",
             command=lambda: self.callbacks['adjust_canvas_zoom'](-0.1)).pack(side=tk.LEFT)
         self.canvas_zoom_scale = Scale(canvas_zoom_control_frame, from_=0.1, to=10, resolution=0.1, orient=tk.HORIZONTAL,
-                                length=150, command=self.callbacks['update_canvas_zoom'])
-        self.canvas_zoom_scale.set(1.0)
+                                length=150, command=self.callbacks['update_canvas_zoom'],
+                                variable=self.canvas_zoom_value)
         self.canvas_zoom_scale.pack(side=tk.LEFT, padx=5, fill=tk.X, expand=True)
         Button(canvas_zoom_control_frame, text="+",
             command=lambda: self.callbacks['adjust_canvas_zoom'](0.1)).pack(side=tk.LEFT)
@@ -0,0 +1,69 @@
+from PIL import Image
+
+
+class RedrawScheduler:
+    """Coalesces redraw requests from sliders, wheel and drag events.
+
+    Any number of requests within a frame collapse into one cheap preview
+    redraw, and a single full quality redraw follows once input settles.
+    """
+
+    FRAME_MS = 16
+    SETTLE_MS = 250
+    PREVIEW_RESAMPLE = Image.BILINEAR
+    FINAL_RESAMPLE = Image.LANCZOS
+
+    def __init__(self, root, redraw):
+        self.root = root
+        self.redraw = redraw
+        self.frame_job = None
+        self.settle_job = None
+        self.dirty = False
+        self.deferred = []
+
+    def request(self, _=None):
+        """Mark the view dirty; accepts and ignores a Tk event or slider value"""
+        if self.frame_job is None:
+            self.frame_job = self.root.after(self.FRAME_MS, self._run_frame)
+        if self.settle_job is not None:
+            self.root.after_cancel(self.settle_job)
+        self.settle_job = self.root.after(self.SETTLE_MS, self._run_final)
+        self.dirty = True
+
+    def defer(self, task):
+        """Run `task` once on the next frame, however often it is deferred"""
+        if task not in self.deferred:
+            self.deferred.append(task)
+        if self.frame_job is None:
+            self.frame_job = self.root.after(self.FRAME_MS, self._run_frame)
+
+    def flush(self):
+        """Drop anything pending and redraw at full quality right away"""
+        for job in (self.frame_job, self.settle_job):
+            if job is not None:
+                self.root.after_cancel(job)
+        self.frame_job = self.settle_job = None
+        self.deferred = []
+        self.dirty = False
+        self.redraw(resample=self.FINAL_RESAMPLE)
+
+    def _run_frame(self):
+        self.frame_job = None
+        if self.dirty:
+            self.dirty = False
+            self.deferred = []
+            self.redraw(resample=self.PREVIEW_RESAMPLE)
+            return
+
+        tasks, self.deferred = self.deferred, []
+        for task in tasks:
+            task()
+
+    def _run_final(self):
+        self.settle_job = None
+        if self.frame_job is not None:
+            self.root.after_cancel(self.frame_job)
+            self.frame_job = None
+        self.dirty = False
+        self.deferred = []
+        self.redraw(resample=self.FINAL_RESAMPLE)
@@ -0,0 +1,88 @@
+from collections import deque, namedtuple
+
+
+# Everything the on-screen view is drawn from. Records are immutable, so a
+# snapshot for undo is just a reference.
+ViewState = namedtuple('ViewState', [
+    'pan_x', 'pan_y', 'canvas_zoom_factor',
+    'grid_size', 'grid_unit', 'line_thickness', 'grid_color',
+    'resize_factor', 'dpi',
+])
+
+DEFAULT_VIEW = ViewState(pan_x=0, pan_y=0, canvas_zoom_factor=1.0,
+                         grid_size=1.0, grid_unit='px', line_thickness=1, grid_color="red",
+                         resize_factor=1.0, dpi=96)
+
+# Changes to these fields need the image resampled; the rest only touch the grid
+IMAGE_FIELDS = frozenset(['canvas_zoom_factor', 'resize_factor'])
+PAN_FIELDS = frozenset(['pan_x', 'pan_y'])
+GRID_FIELDS = frozenset(['grid_size', 'grid_unit', 'line_thickness', 'dpi'])
+COLOR_FIELDS = frozenset(['grid_color'])
+
+# resize_factor and dpi follow the resize and DPI controls, which are document
+# settings rather than part of undo
+UNDO_FIELDS = tuple(field for field in ViewState._fields if field not in ('resize_factor', 'dpi'))
+
+
+def changed_fields(old, new):
+    """Names of the fields that differ; every field when there is no old state"""
+    if old is None:
+        return frozenset(ViewState._fields)
+    return frozenset(field for field, before, after in zip(ViewState._fields, old, new)
+                     if before != after)
+
+
+class ViewHistory:
+    """Undo and redo stacks of view states.
+
+    record() is called whenever the view settles; only states that differ
+    in an undoable field from the last recorded one become undo steps, so
+    a whole drag or slider movement is one step.
+    """
+
+    MAX_STEPS = 100
+
+    def __init__(self, max_steps=None):
+        self.undo_stack = deque(maxlen=max_steps or self.MAX_STEPS)
+        self.redo_stack = []
+        self.current = None
+
+    def _key(self, state):
+        return tuple(getattr(state, field) for field in UNDO_FIELDS)
+
+    def record(self, state):
+        if self.current is not None and self._key(state) != self._key(self.current):
+            self.undo_stack.append(self.current)
+            self.redo_stack.clear()
+        self.current = state
+
+    def undo(self):
+        """Return the state to go back to, or None"""
+        if not self.undo_stack:
+            return None
+        self.redo_stack.append(self.current)
+        self.current = self.undo_stack.pop()
+        return self.current
+
+    def redo(self):
+        """Return the state to go forward to, or None"""
+        if not self.redo_stack:
+            return None
+        self.undo_stack.append(self.current)
+        self.current = self.redo_stack.pop()
+        return self.current
+
+    def clear(self):
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.current = None
+
+
+def view_property(field):
+    """Attribute that reads and writes one field of the owner's `view` record"""
+    def get(owner):
+        return getattr(owner.view, field)
+
+    def set(owner, value):
+        owner.view = owner.view._replace(**{field: value})
+    return property(get, set)
@@ -0,0 +1,66 @@
+class CanvasItemPool:
+    """Retained set of canvas items of one type that share a tag.
+
+    update() moves and restyles the existing items in place with coords and
+    itemconfig, and only creates or deletes items when the number needed
+    changes. Options are remembered per item so unchanged ones are never
+    sent to Tk again.
+    """
+
+    def __init__(self, canvas, item_type, tag):
+        self.canvas = canvas
+        self.item_type = item_type
+        self.tag = tag
+        self.items = []
+        self.coords = []
+        self.options = []
+
+    def update(self, specs):
+        """Show one item per (coords, options) pair in specs"""
+        create = getattr(self.canvas, 'create_' + self.item_type)
+        for index, (coords, options) in enumerate(specs):
+            if index == len(self.items):
+                self.items.append(create(*coords, tags=self.tag, **options))
+                self.coords.append(coords)
+                self.options.append(dict(options))
+                continue
+
+            item = self.items[index]
+            if coords != self.coords[index]:
+                self.canvas.coords(item, *coords)
+                self.coords[index] = coords
+            current = self.options[index]
+            changed = {name: value for name, value in options.items() if current.get(name) != value}
+            if changed:
+                self.canvas.itemconfig(item, **changed)
+                current.update(changed)
+
+        self._truncate(len(specs))
+
+    def restyle(self, **options):
+        """Set the same options on every item with a single call on the tag"""
+        if not self.items:
+            return
+        self.canvas.itemconfig(self.tag, **options)
+        for current in self.options:
+            current.update(options)
+
+    def move(self, dx, dy):
+        """Translate every item, keeping the remembered coordinates in step"""
+        if not self.items or (dx == 0 and dy == 0):
+            return
+        self.canvas.move(self.tag, dx, dy)
+        self.coords = [
+            tuple(value + (dx if i % 2 == 0 else dy) for i, value in enumerate(coords))
+            for coords in self.coords
+        ]
+
+    def clear(self):
+        self._truncate(0)
+
+    def _truncate(self, count):
+        for item in self.items[count:]:
+            self.canvas.delete(item)
+        del self.items[count:]
+        del self.coords[count:]
+        del self.options[count:]
@@ -0,0 +1,149 @@
+"""Background export queue.
+
+Exports run one after another on a single worker thread so the Tk main
+loop stays responsive. Each job reports its stage and progress through
+ExportJob.report(), which is also where cancellation takes effect: once a
+job is cancelled, its next report raises ExportCancelled and the task
+unwinds. Tk must only be touched from the main thread, so the queue never
+calls back into the UI; the UI polls changed jobs with poll().
+"""
+import itertools
+import queue
+import threading
+from collections import deque
+
+
+class ExportCancelled(Exception):
+    pass
+
+
+class ExportJob:
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    CANCELLED = 'cancelled'
+
+    def __init__(self, job_id, description, task, updates):
+        self.job_id = job_id
+        self.description = description
+        self.task = task
+        self.state = self.QUEUED
+        self.stage = None
+        self.fraction = 0.0
+        self.result = None
+        self.error = None
+        self.cancel_event = threading.Event()
+        self.updates = updates
+
+    @property
+    def finished(self):
+        return self.state in (self.DONE, self.FAILED, self.CANCELLED)
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def report(self, stage, fraction):
+        """Record progress from the task; raises ExportCancelled once the job is cancelled"""
+        if self.cancel_event.is_set():
+            raise ExportCancelled(self.description)
+        self.stage = stage
+        self.fraction = fraction
+        self.updates.put(self)
+
+
+class ExportQueue:
+    def __init__(self):
+        self.jobs = deque()
+        self.current = None
+        self.lock = threading.Lock()
+        self.updates = queue.Queue()
+        self.worker = None
+        self.ids = itertools.count(1)
+
+    def submit(self, description, task):
+        """Queue task(job) to run on the worker thread and return its ExportJob"""
+        job = ExportJob(next(self.ids), description, task, self.updates)
+        with self.lock:
+            self.jobs.append(job)
+            if self.worker is None:
+                self.worker = threading.Thread(target=self._run, daemon=True)
+                self.worker.start()
+        self.updates.put(job)
+        return job
+
+    def pending(self):
+        """Jobs not yet started"""
+        with self.lock:
+            return list(self.jobs)
+
+    @property
+    def busy(self):
+        with self.lock:
+            return self.current is not None or bool(self.jobs)
+
+    def cancel_current(self):
+        """Cancel the running job, or else the next queued one. Returns the job or None"""
+        with self.lock:
+            job = self.current or (self.jobs[0] if self.jobs else None)
+        if job is not None:
+            job.cancel()
+        return job
+
+    def cancel_all(self):
+        with self.lock:
+            jobs = ([self.current] if self.current else []) + list(self.jobs)
+        for job in jobs:
+            job.cancel()
+
+    def join(self, timeout=None):
+        """Wait up to timeout seconds for the worker to run out of jobs"""
+        with self.lock:
+            worker = self.worker
+        if worker is not None:
+            worker.join(timeout)
+
+    def poll(self):
+        """Jobs whose state or progress changed since the last call, oldest change first"""
+        changed = []
+        while True:
+            try:
+                job = self.updates.get_nowait()
+            except queue.Empty:
+                return changed
+            if job in changed:
+                changed.remove(job)
+            changed.append(job)
+
+    def _run(self):
+        while True:
+            with self.lock:
+                if not self.jobs:
+                    self.worker = None
+                    return
+                job = self.current = self.jobs.popleft()
+
+            if job.cancelled:
+                job.state = ExportJob.CANCELLED
+            else:
+                job.state = ExportJob.RUNNING
+                self.updates.put(job)
+                try:
+                    job.result = job.task(job)
+                    job.state = ExportJob.DONE
+                    job.fraction = 1.0
+                except ExportCancelled:
+                    job.state = ExportJob.CANCELLED
+                except Exception as e:
+                    job.error = e
+                    job.state = ExportJob.FAILED
+
+            # Report the final state before the queue stops looking busy, so a
+            # poller that sees busy go false has already been sent it
+            self.updates.put(job)
+            with self.lock:
+                self.current = None
@@ -0,0 +1,154 @@
+"""Opt-in frame timing for the interactive redraw path.
+
+FrameProfiler keeps a rolling window of durations per named phase
+(tile rendering, PhotoImage creation, grid and label drawing, ...) plus
+per-frame times for an FPS estimate. While disabled, frame() and phase()
+hand back a shared no-op context manager so the instrumented code costs
+next to nothing.
+"""
+import contextlib
+import json
+import threading
+import time
+from collections import deque
+
+
+# Upper edges of the latency histogram buckets, in milliseconds
+HISTOGRAM_EDGES_MS = (1, 2, 4, 8, 16, 33, 66, 133, 266)
+
+_NO_OP = contextlib.nullcontext()
+
+
+class _PhaseTimer:
+    __slots__ = ('profiler', 'name', 'start')
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.profiler.record(self.name, time.perf_counter() - self.start)
+
+
+class FrameProfiler:
+    WINDOW = 240
+    FRAME = 'frame'
+
+    def __init__(self, enabled=False, window=None):
+        self.enabled = enabled
+        self.window = window or self.WINDOW
+        self.samples = {}
+        self.frame_times = deque(maxlen=self.window)
+        # Worker threads record tile render times too
+        self.lock = threading.Lock()
+        self.capture = None
+
+    def frame(self):
+        """Time one whole redraw; also counts towards FPS"""
+        if not self.enabled:
+            return _NO_OP
+        self.frame_times.append(time.perf_counter())
+        return _PhaseTimer(self, self.FRAME)
+
+    def phase(self, name):
+        """Time one named step of a redraw"""
+        if not self.enabled:
+            return _NO_OP
+        return _PhaseTimer(self, name)
+
+    def record(self, name, seconds):
+        with self.lock:
+            samples = self.samples.get(name)
+            if samples is None:
+                samples = self.samples[name] = deque(maxlen=self.window)
+            samples.append(seconds * 1000)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+            self.frame_times.clear()
+
+    def fps(self):
+        """Frames started during the last second"""
+        if not self.frame_times:
+            return 0.0
+        horizon = time.perf_counter() - 1.0
+        return float(sum(1 for started in self.frame_times if started >= horizon))
+
+    def stats(self):
+        """Per phase count, mean, p50, p95, max (ms) and histogram over the window"""
+        with self.lock:
+            snapshot = {name: sorted(samples) for name, samples in self.samples.items() if samples}
+
+        stats = {}
+        for name, values in snapshot.items():
+            histogram = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+            for value in values:
+                bucket = 0
+                while bucket < len(HISTOGRAM_EDGES_MS) and value > HISTOGRAM_EDGES_MS[bucket]:
+                    bucket += 1
+                histogram[bucket] += 1
+            stats[name] = {
+                'count': len(values),
+                'mean_ms': sum(values) / len(values),
+                'p50_ms': values[len(values) // 2],
+                'p95_ms': values[min(len(values) - 1, int(len(values) * 0.95))],
+                'max_ms': values[-1],
+                'histogram': histogram,
+            }
+        return stats
+
+    def worst_phase(self, stats=None):
+        """(name, p95) of the slowest phase other than the whole frame, or None"""
+        stats = stats if stats is not None else self.stats()
+        phases = [(values['p95_ms'], name) for name, values in stats.items() if name != self.FRAME]
+        if not phases:
+            return None
+        p95, name = max(phases)
+        return name, p95
+
+    def summary(self):
+        """One line for the HUD"""
+        stats = self.stats()
+        frame = stats.get(self.FRAME)
+        text = f"FPS {self.fps():.0f}"
+        if frame:
+            text += f" | frame p95 {frame['p95_ms']:.1f}ms max {frame['max_ms']:.1f}ms"
+        worst = self.worst_phase(stats)
+        if worst:
+            text += f" | worst {worst[0]} {worst[1]:.1f}ms"
+        if self.capture is not None:
+            text += " | cProfile recording"
+        return text
+
+    def dump(self, file_path):
+        """Write the current statistics as JSON"""
+        report = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'window': self.window,
+            'fps': self.fps(),
+            'histogram_edges_ms': list(HISTOGRAM_EDGES_MS),
+            'phases': self.stats(),
+        }
+        with open(file_path, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    def toggle_capture(self, file_path):
+        """Start a cProfile capture, or stop the running one and save it to file_path.
+
+        Returns True when a capture was started, False when one was saved.
+        """
+        if self.capture is None:
+            # Imported here; the profiler is off in normal use
+            import cProfile
+            self.capture = cProfile.Profile()
+            self.capture.enable()
+            return True
+        self.capture.disable()
+        self.capture.dump_stats(file_path)
+        self.capture = None
+        return False
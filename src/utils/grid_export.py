@@ -0,0 +1,538 @@
+"""Grid exports: single image, strip-streamed, paged PDF and vector.
+
+Imported on first export rather than at startup (see main.ArtGridApp.grid_exporter).
+"""
+import math
+import os
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image, ImageDraw
+from src.utils.grid_rasterizer import draw_grid_lines, line_span
+from src.utils.grid_utils import GridLayout
+from src.utils.image_source import PILImageSource, as_image_source
+from src.utils.label_cache import LabelCache, load_font
+from src.utils.pdf_writer import PdfPageWriter, encode_page
+from src.utils.strip_writer import STREAMING_EXTENSIONS, open_strip_writer
+from src.utils import vector_export
+
+
+# Share of an export done when each stage starts, for progress reporting.
+# A streamed export goes through every stage once per strip.
+EXPORT_STAGES = OrderedDict([('resize', 0.0), ('grid', 0.4), ('labels', 0.55), ('encode', 0.7)])
+
+
+def report_stage(progress, stage, done=0, total=1):
+    """Call progress(stage, fraction of the whole export) if a callback was given"""
+    if progress is not None:
+        progress(stage, (done + EXPORT_STAGES[stage]) / total)
+
+
+class GridOverlayCache:
+    """Memory-bounded LRU of ready-made grid overlay layers.
+
+    An overlay is the export canvas with white margins and labels, a
+    transparent picture area and opaque grid lines. Every pixel is either
+    fully opaque or fully transparent, so compositing it over the pasted
+    picture gives exactly what drawing the grid directly would.
+
+    A layer is as big as the whole export, so the cache only pays off for
+    batches that grid many pictures of one size; GridExporter uses one
+    only when it is given one.
+    """
+
+    MAX_BYTES = 128 * 1024 * 1024
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or self.MAX_BYTES
+        self.layers = OrderedDict()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key, build):
+        """Return the overlay for key, calling build() to make it on a miss"""
+        with self.lock:
+            layer = self.layers.get(key)
+            if layer is not None:
+                self.layers.move_to_end(key)
+                self.hits += 1
+                return layer
+            self.misses += 1
+
+        layer = build()
+        layer_bytes = layer.width * layer.height * len(layer.getbands())
+        # A layer bigger than the whole budget is used once and not kept
+        if layer_bytes > self.max_bytes:
+            return layer
+
+        with self.lock:
+            if key not in self.layers:
+                self.layers[key] = layer
+                self.size_bytes += layer_bytes
+            while self.size_bytes > self.max_bytes:
+                _, evicted = self.layers.popitem(last=False)
+                self.size_bytes -= evicted.width * evicted.height * len(evicted.getbands())
+                self.evictions += 1
+        return layer
+
+    def stats(self):
+        return {
+            'entries': len(self.layers),
+            'bytes': self.size_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+        }
+
+
+class GridExporter:
+    # Exports with more output pixels than this are written strip by strip
+    STREAMING_THRESHOLD_PIXELS = 40_000_000
+    STRIP_HEIGHT = 512
+    # Paged (PDF) export: sheet sizes in mm (portrait), unprintable border
+    # and how much neighbouring pages repeat so they can be trimmed and taped
+    PAPER_SIZES_MM = OrderedDict([
+        ('A4', (210, 297)),
+        ('A3', (297, 420)),
+        ('Letter', (215.9, 279.4)),
+        ('Legal', (215.9, 355.6)),
+    ])
+    PAGE_MARGIN_MM = 10
+    PAGE_OVERLAP_MM = 10
+
+    def __init__(self, overlay_cache=None):
+        self.label_cache = LabelCache()
+        # Optional GridOverlayCache; without one the grid is drawn straight into each export
+        self.overlay_cache = overlay_cache
+
+    def compute_layout(self, image_size, grid_width, grid_height, line_thickness, resize_factor):
+        """Work out export size, margins and label font for an export"""
+        img_width, img_height = image_size
+
+        export_width = int(img_width * resize_factor)
+        export_height = int(img_height * resize_factor)
+
+        # Grid dimensions should remain constant in actual units; they may be fractional pixels
+        scaled_grid_width = grid_width
+        scaled_grid_height = grid_height
+        # Ensure line thickness is integer pixels
+        scaled_line_thickness = max(1, int(line_thickness))
+
+        # Line and label positions, shared with every other export of this grid
+        grid = GridLayout.for_grid(export_width, export_height, scaled_grid_width, scaled_grid_height)
+
+        # Calculate number of cells to determine margin requirements
+        num_cols = len(grid.x_lines) - 1
+        num_rows = len(grid.y_lines) - 1
+
+        # Scale font size based on grid dimensions and zoom factor
+        font_size = int(max(10, min(16, min(scaled_grid_width, scaled_grid_height) // 3)))
+        font = load_font(font_size)
+
+        # Calculate required margins based on actual text dimensions
+        # Test longest column number (highest number)
+        col_text_width, col_text_height = self.text_size(str(num_cols), font, font_size)
+        # Test longest row number
+        row_text_width, row_text_height = self.text_size(str(num_rows), font, font_size)
+
+        # Calculate margins with padding
+        top_margin = col_text_height + 10  # 10px padding
+        left_margin = row_text_width + 10  # 10px padding
+
+        return {
+            'export_width': export_width,
+            'export_height': export_height,
+            'grid_width': scaled_grid_width,
+            'grid_height': scaled_grid_height,
+            'grid': grid,
+            'line_thickness': scaled_line_thickness,
+            'font': font,
+            'font_size': font_size,
+            'left_margin': left_margin,
+            'top_margin': top_margin,
+            'canvas_size': (export_width + left_margin + 10, export_height + top_margin + 10),
+        }
+
+    def text_size(self, text, font, font_size):
+        """Label size as used for layout; older Pillow versions measure with textsize"""
+        if hasattr(ImageDraw.ImageDraw, 'textsize'):
+            return ImageDraw.Draw(Image.new('RGB', (1, 1))).textsize(text, font=font)
+        return len(text) * font_size // 2, font_size
+
+    def draw_overlay(self, image, layout, grid_color, offset_y=0, progress=None):
+        """Draw grid lines and coordinate labels onto `image`.
+
+        `image` holds the rows starting at offset_y of the full export
+        canvas, so the same call draws a whole export or a single strip.
+        """
+        export_width, export_height = layout['export_width'], layout['export_height']
+        grid = layout['grid']
+        left_margin, top_margin = layout['left_margin'], layout['top_margin']
+        font, font_size = layout['font'], layout['font_size']
+        strip_top, strip_bottom = offset_y, offset_y + image.height
+        # Anything further than this from the strip cannot touch it
+        reach = max(layout['line_thickness'], font_size) + 1
+
+        # Draw grid lines (crisp, pixel-aligned)
+        draw_grid_lines(
+            image,
+            [left_margin + x for x in grid.x_lines],
+            [top_margin + y - offset_y for y in grid.y_lines
+             if strip_top - reach <= top_margin + y <= strip_bottom + reach],
+            int(left_margin), int(top_margin) - offset_y,
+            int(export_width + left_margin), int(export_height + top_margin) - offset_y,
+            layout['line_thickness'], grid_color)
+        report_stage(progress, 'labels')
+
+        # Labels are stamped from cached sprites instead of being rasterized each time
+        # Draw column numbers using scaled grid dimensions - snap to integer pixels
+        if top_margin // 2 - reach <= strip_bottom and top_margin // 2 + reach >= strip_top:
+            for col, center in enumerate(grid.x_centers):
+                col_num = str(col + 1)
+                cell_center_x = left_margin + center
+
+                text_width, text_height = self.text_size(col_num, font, font_size)
+
+                # Position column numbers above the grid - snap to integer pixels
+                self.label_cache.draw(
+                    image,
+                    (int(cell_center_x - text_width // 2), int(top_margin // 2 - text_height // 2) - offset_y),
+                    col_num, font_size, "blue")
+
+        # Draw row numbers using scaled grid dimensions - snap to integer pixels
+        for row, center in enumerate(grid.y_centers):
+            row_num = str(row + 1)
+            cell_center_y = top_margin + center
+            if not strip_top - reach <= cell_center_y <= strip_bottom + reach:
+                continue
+
+            text_width, text_height = self.text_size(row_num, font, font_size)
+
+            # Position row numbers to the left of the grid - snap to integer pixels
+            self.label_cache.draw(
+                image,
+                (int(left_margin // 2 - text_width // 2), int(cell_center_y - text_height // 2) - offset_y),
+                row_num, font_size, "blue")
+
+    def vector_geometry(self, layout):
+        """Grid line centres and label anchors of an export, for the vector writers.
+
+        Positions are those draw_overlay rasterizes: a line of thickness t
+        at pixel x covers the pixels of line_span(x, t), so its vector
+        centre is the middle of that span.
+        """
+        export_width, export_height = layout['export_width'], layout['export_height']
+        grid = layout['grid']
+        left_margin, top_margin = layout['left_margin'], layout['top_margin']
+        thickness = layout['line_thickness']
+
+        def centre(position):
+            first, last = line_span(position, thickness)
+            return (first + last + 1) / 2
+
+        labels = [(str(col + 1), left_margin + center, top_margin // 2)
+                  for col, center in enumerate(grid.x_centers)]
+        labels += [(str(row + 1), left_margin // 2, top_margin + center)
+                   for row, center in enumerate(grid.y_centers)]
+        return {
+            'canvas_size': layout['canvas_size'],
+            'picture_box': (left_margin, top_margin, left_margin + export_width, top_margin + export_height),
+            'line_thickness': thickness,
+            'font_size': layout['font_size'],
+            'x_lines': [centre(left_margin + x) for x in grid.x_lines],
+            'y_lines': [centre(top_margin + y) for y in grid.y_lines],
+            'labels': labels,
+        }
+
+    def get_overlay(self, layout, grid_color, progress=None):
+        """Return the cached grid and label layer for this layout"""
+        key = (layout['canvas_size'], layout['export_width'], layout['export_height'],
+               layout['grid_width'], layout['grid_height'], layout['line_thickness'],
+               layout['font_size'], grid_color)
+        return self.overlay_cache.get(key, lambda: self.build_overlay(layout, grid_color, progress))
+
+    def build_overlay(self, layout, grid_color, progress=None):
+        overlay = Image.new('RGBA', layout['canvas_size'], (255, 255, 255, 255))
+        left, top = layout['left_margin'], layout['top_margin']
+        overlay.paste((0, 0, 0, 0), (left, top, left + layout['export_width'], top + layout['export_height']))
+        self.draw_overlay(overlay, layout, grid_color, progress=progress)
+        return overlay
+
+    def should_stream(self, original_image, resize_factor, file_path):
+        """Whether an export should be written strip by strip.
+
+        True for PNG/TIFF output that is very large or whose source is a
+        memory-mapped file that should not be decoded all at once.
+        """
+        source = as_image_source(original_image)
+        export_pixels = int(source.width * resize_factor) * int(source.height * resize_factor)
+        return ((export_pixels > self.STREAMING_THRESHOLD_PIXELS or not source.in_memory)
+                and file_path.lower().endswith(STREAMING_EXTENSIONS))
+
+    def export_image_with_grid(self, original_image, file_path, grid_width, grid_height,
+                              line_thickness, grid_color, resize_factor, dpi=96, progress=None):
+        """Export the resized image with grid and labels in one piece.
+
+        progress, if given, is called as progress(stage, fraction) when each
+        of the EXPORT_STAGES starts; an exception it raises aborts the export.
+        """
+        # original_image may be a PIL image or an ImageSource
+        source = as_image_source(original_image)
+        layout = self.compute_layout(source.size, grid_width, grid_height,
+                                     line_thickness, resize_factor)
+
+        report_stage(progress, 'resize')
+        # Use LANCZOS for consistent scaling with canvas display
+        resized_image = source.resize_region((layout['export_width'], layout['export_height']), Image.LANCZOS)
+
+        export_image = Image.new('RGBA', layout['canvas_size'], (255, 255, 255, 255))
+        export_image.paste(resized_image, (layout['left_margin'], layout['top_margin']))
+
+        report_stage(progress, 'grid')
+        if self.overlay_cache is None:
+            self.draw_overlay(export_image, layout, grid_color, progress=progress)
+        else:
+            # Same-sized exports with the same grid share one overlay layer
+            export_image.alpha_composite(self.get_overlay(layout, grid_color, progress))
+
+        # JPEG has no alpha channel
+        if file_path.lower().endswith(('.jpg', '.jpeg')):
+            export_image = export_image.convert('RGB')
+
+        # Save with correct DPI for accurate measurements
+        report_stage(progress, 'encode')
+        try:
+            export_image.save(file_path, dpi=(dpi, dpi))
+        except Exception as e:
+            # Fallback: save without DPI if there's an error
+            export_image.save(file_path)
+        return True
+
+    def export_image_with_grid_streaming(self, original_image, file_path, grid_width, grid_height,
+                                         line_thickness, grid_color, resize_factor, dpi=96,
+                                         strip_height=None, progress=None):
+        """Same output as export_image_with_grid, produced one horizontal strip at a time.
+
+        Each strip is resampled straight from the matching rows of the
+        original (only those rows are read from a mapped source), composited with the grid and labels and encoded before the
+        next one starts, so peak memory depends on the strip height and not
+        on the export size. Writes PNG or TIFF. progress is called for
+        every stage of every strip, so cancelling takes effect within a strip.
+        """
+        source = as_image_source(original_image)
+        layout = self.compute_layout(source.size, grid_width, grid_height,
+                                     line_thickness, resize_factor)
+        export_width, export_height = layout['export_width'], layout['export_height']
+        left_margin, top_margin = layout['left_margin'], layout['top_margin']
+        canvas_width, canvas_height = layout['canvas_size']
+        strip_height = strip_height or self.STRIP_HEIGHT
+
+        if source.mode not in ('RGB', 'RGBA', 'L'):
+            source = PILImageSource(source.to_image().convert('RGBA'))
+        source_width, source_height = source.size
+        scale_y = source_height / export_height
+
+        with open_strip_writer(file_path, canvas_width, canvas_height, 'RGBA', dpi) as writer:
+            strip_count = -(-canvas_height // strip_height)
+            for strip_index, strip_top in enumerate(range(0, canvas_height, strip_height)):
+                report_stage(progress, 'resize', strip_index, strip_count)
+                strip_bottom = min(strip_top + strip_height, canvas_height)
+                strip = Image.new('RGBA', (canvas_width, strip_bottom - strip_top), (255, 255, 255, 255))
+
+                # Export rows of the picture itself that fall into this strip
+                image_top = max(strip_top, top_margin)
+                image_bottom = min(strip_bottom, top_margin + export_height)
+                if image_top < image_bottom:
+                    source_box = (0, (image_top - top_margin) * scale_y,
+                                  source_width, (image_bottom - top_margin) * scale_y)
+                    piece = source.resize_region((export_width, image_bottom - image_top),
+                                                 Image.LANCZOS, source_box)
+                    strip.paste(piece, (left_margin, image_top - strip_top))
+
+                report_stage(progress, 'grid', strip_index, strip_count)
+                self.draw_overlay(strip, layout, grid_color, offset_y=strip_top)
+                report_stage(progress, 'encode', strip_index, strip_count)
+                writer.write(strip)
+        return True
+
+    def export_image_with_grid_vector(self, original_image, file_path, grid_width, grid_height,
+                                      line_thickness, grid_color, resize_factor, dpi=96, progress=None):
+        """Export with the picture as one embedded raster and the grid and labels as vectors.
+
+        Writes SVG for .svg paths and a single-page PDF otherwise. The page
+        has the same size and layout as the raster export.
+        """
+        source = as_image_source(original_image)
+        layout = self.compute_layout(source.size, grid_width, grid_height,
+                                     line_thickness, resize_factor)
+
+        report_stage(progress, 'resize')
+        picture = vector_export.flatten(
+            source.resize_region((layout['export_width'], layout['export_height']), Image.LANCZOS))
+        report_stage(progress, 'grid')
+        geometry = self.vector_geometry(layout)
+
+        report_stage(progress, 'encode')
+        if file_path.lower().endswith('.svg'):
+            vector_export.write_svg(file_path, geometry, picture, grid_color, dpi)
+        else:
+            vector_export.write_pdf(file_path, geometry, picture, grid_color, dpi)
+        return True
+
+    def plan_pages(self, source_size, grid_width, grid_height, line_thickness, resize_factor,
+                   dpi=96, paper='A4', overlap_mm=None):
+        """Split the gridded export into printable pages of paper at dpi.
+
+        Returns the export layout from compute_layout extended with the page
+        size, the origin and size of the picture area on each page, and the
+        (left, top, right, bottom) region of the export each page shows, in
+        reading order. Portrait or landscape is whichever needs fewer sheets.
+        """
+        if paper not in self.PAPER_SIZES_MM:
+            raise ValueError(f"Unknown paper size: {paper}")
+        layout = self.compute_layout(source_size, grid_width, grid_height, line_thickness, resize_factor)
+        export_width, export_height = layout['export_width'], layout['export_height']
+        overlap_mm = self.PAGE_OVERLAP_MM if overlap_mm is None else overlap_mm
+
+        def pixels(mm):
+            return int(round(mm / 25.4 * dpi))
+
+        margin = pixels(self.PAGE_MARGIN_MM)
+        overlap = pixels(overlap_mm)
+        # Band at the bottom of the printable area for the page caption
+        caption_height = self.text_size("Page", layout['font'], layout['font_size'])[1] + 10  # 10px padding
+
+        def page_starts(length, area):
+            step = area - overlap
+            if step <= 0:
+                raise ValueError("Page overlap is larger than the printable area")
+            count = 1 if length <= area else 1 + math.ceil((length - area) / step)
+            return [i * step for i in range(count)]
+
+        plans = []
+        paper_width, paper_height = self.PAPER_SIZES_MM[paper]
+        for page_size in ((pixels(paper_width), pixels(paper_height)),
+                          (pixels(paper_height), pixels(paper_width))):
+            # Labels repeat on every page in bands above and left of the picture, and
+            # a line on the picture's far edge is drawn just past it
+            line_overhang = layout['line_thickness'] // 2 + 1
+            area_width = page_size[0] - 2 * margin - layout['left_margin'] - line_overhang
+            area_height = page_size[1] - 2 * margin - layout['top_margin'] - caption_height - line_overhang
+            if area_width <= 0 or area_height <= 0:
+                raise ValueError("Paper is too small for the labels at this DPI")
+            columns = page_starts(export_width, area_width)
+            rows = page_starts(export_height, area_height)
+            plans.append((len(columns) * len(rows), page_size, area_width, area_height, columns, rows))
+        # Ties go to portrait
+        _, page_size, area_width, area_height, columns, rows = min(plans, key=lambda plan: plan[0])
+
+        layout.update({
+            'dpi': dpi,
+            'page_size': page_size,
+            'page_margin': margin,
+            'caption_height': caption_height,
+            'area_origin': (margin + layout['left_margin'], margin + layout['top_margin']),
+            'area_size': (area_width, area_height),
+            'page_columns': len(columns),
+            'page_rows': len(rows),
+            'pages': [(left, top, min(left + area_width, export_width), min(top + area_height, export_height))
+                      for top in rows for left in columns],
+        })
+        return layout
+
+    def render_page(self, source, layout, index, grid_color):
+        """Draw page `index` of a plan_pages layout as an RGB image.
+
+        Grid lines sit where they do in the single-image export and labels
+        keep the global column and row numbers, so overlapping pages line
+        up when assembled.
+        """
+        left, top, right, bottom = layout['pages'][index]
+        origin_x, origin_y = layout['area_origin']
+        grid = layout['grid']
+        font_size = layout['font_size']
+        page = Image.new('RGB', layout['page_size'], (255, 255, 255))
+
+        # Resample only the part of the source this page shows
+        scale_x = source.width / layout['export_width']
+        scale_y = source.height / layout['export_height']
+        piece = source.resize_region((right - left, bottom - top), Image.LANCZOS,
+                                     (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y))
+        page.paste(piece, (origin_x, origin_y))
+
+        draw_grid_lines(
+            page,
+            [origin_x + x - left for x in grid.x_lines if left <= x <= right],
+            [origin_y + y - top for y in grid.y_lines if top <= y <= bottom],
+            origin_x, origin_y, origin_x + right - left, origin_y + bottom - top,
+            layout['line_thickness'], grid_color)
+
+        # Column and row numbers of the cells whose centres are on this page
+        label_y = layout['page_margin'] + layout['top_margin'] // 2
+        for col, center in enumerate(grid.x_centers):
+            if left <= center < right:
+                text_width, text_height = self.text_size(str(col + 1), layout['font'], font_size)
+                self.label_cache.draw(
+                    page, (origin_x + center - left - text_width // 2, label_y - text_height // 2),
+                    str(col + 1), font_size, "blue")
+        label_x = layout['page_margin'] + layout['left_margin'] // 2
+        for row, center in enumerate(grid.y_centers):
+            if top <= center < bottom:
+                text_width, text_height = self.text_size(str(row + 1), layout['font'], font_size)
+                self.label_cache.draw(
+                    page, (label_x - text_width // 2, origin_y + center - top - text_height // 2),
+                    str(row + 1), font_size, "blue")
+
+        # Where the sheet goes in the assembled poster, in the band below the picture
+        page_row, page_col = divmod(index, layout['page_columns'])
+        caption = (f"Page {index + 1} of {len(layout['pages'])} - "
+                   f"row {page_row + 1}, column {page_col + 1}")
+        caption_y = layout['page_size'][1] - layout['page_margin'] - layout['caption_height'] + 5
+        self.label_cache.draw(page, (origin_x, caption_y), caption, font_size, "gray")
+        return page
+
+    def export_image_with_grid_paged(self, original_image, file_path, grid_width, grid_height,
+                                     line_thickness, grid_color, resize_factor, dpi=96,
+                                     paper='A4', overlap_mm=None, workers=None, progress=None):
+        """Write the gridded export as a multi-page PDF of printable sheets.
+
+        Pages are rendered and compressed on a thread pool but written in
+        order as they finish, with at most `workers` pages in flight, so
+        memory depends on the page size and not on the poster size.
+        progress is called as each page is written; an exception it raises
+        stops the export.
+        """
+        source = as_image_source(original_image)
+        if source.mode not in ('RGB', 'RGBA', 'L'):
+            source = PILImageSource(source.to_image().convert('RGB'))
+        elif source.in_memory:
+            # Decode once up front instead of racing to load in every worker
+            source.to_image().load()
+        layout = self.plan_pages(source.size, grid_width, grid_height, line_thickness,
+                                 resize_factor, dpi, paper, overlap_mm)
+        page_count = len(layout['pages'])
+        workers = max(1, workers or os.cpu_count() or 1)
+
+        def render(index):
+            return encode_page(self.render_page(source, layout, index, grid_color), dpi)
+
+        with ThreadPoolExecutor(max_workers=workers) as executor, PdfPageWriter(file_path) as writer:
+            in_flight = deque()
+            next_page = 0
+            try:
+                for index in range(page_count):
+                    while next_page < page_count and len(in_flight) < workers:
+                        in_flight.append(executor.submit(render, next_page))
+                        next_page += 1
+                    report_stage(progress, 'resize', index, page_count)
+                    page = in_flight.popleft().result()
+                    report_stage(progress, 'encode', index, page_count)
+                    writer.add_page(page)
+            except BaseException:
+                for future in in_flight:
+                    future.cancel()
+                raise
+        return True
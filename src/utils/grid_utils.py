@@ -1,159 +1,332 @@
-import string
-import tkinter as tk
-from PIL import Image, ImageDraw, ImageFont
+"""On-screen grid drawing and the grid line placement shared with exports.
+
+The exporters live in src.utils.grid_export so that the canvas path does
+not pay for loading fonts, PDF and SVG writers at startup.
+"""
+import math
+import threading
+from array import array
+from collections import OrderedDict
+from PIL import Image
+from src.utils.canvas_item_pool import CanvasItemPool
+from src.utils.grid_rasterizer import draw_grid_lines
+
+
+# Tolerance when counting how many whole cells fit, so float spacings that
+# divide a length exactly are not short by one line
+CELL_COUNT_EPSILON = 1e-9
+
+
+def cell_count(length, spacing):
+    """Number of whole cells of (possibly fractional) spacing that fit in length"""
+    return int(length / spacing + CELL_COUNT_EPSILON)
+
+
+def grid_line_positions(length, spacing, offset=0):
+    """Integer positions of the grid lines across length, starting at offset.
+
+    Each position is rounded from i * spacing instead of adding a rounded
+    step, so fractional spacings (1 mm at 300 DPI is 11.81 px) never drift
+    by more than half a pixel however many cells there are.
+    """
+    return [offset + round(i * spacing) for i in range(cell_count(length, spacing) + 1)]
+
+
+class GridLayout:
+    """Where the grid lines and cell labels fall over a picture, in its pixels.
+
+    Lines are at grid_line_positions(); label centres at the floored cell
+    middles, including the partial cell at the far edge. Positions are kept
+    in compact integer arrays, and for_grid() shares one layout per set of
+    grid parameters, so the canvas, the labels and the exporters all place
+    the grid identically and it is only recomputed when the grid changes.
+    """
+
+    # Layouts kept by for_grid(); the canvas and a few exports in flight need only a handful
+    MAX_CACHED = 16
+    _instances = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, width, height, cell_width, cell_height):
+        self.width = width
+        self.height = height
+        self.cell_width = cell_width
+        self.cell_height = cell_height
+        self.x_lines = array('l', grid_line_positions(width, cell_width))
+        self.y_lines = array('l', grid_line_positions(height, cell_height))
+        # Labelled cells, counting a partial one at the right or bottom edge
+        self.columns = math.ceil(width / cell_width - CELL_COUNT_EPSILON)
+        self.rows = math.ceil(height / cell_height - CELL_COUNT_EPSILON)
+        self.x_centers = array('l', (math.floor((col + 0.5) * cell_width) for col in range(self.columns)))
+        self.y_centers = array('l', (math.floor((row + 0.5) * cell_height) for row in range(self.rows)))
+
+    @classmethod
+    def for_grid(cls, width, height, cell_width, cell_height):
+        """Shared layout for a width x height picture with cells of the given (fractional) size"""
+        key = (width, height, cell_width, cell_height)
+        with cls._lock:
+            layout = cls._instances.get(key)
+            if layout is not None:
+                cls._instances.move_to_end(key)
+                return layout
+        layout = cls(width, height, cell_width, cell_height)
+        with cls._lock:
+            cls._instances[key] = layout
+            while len(cls._instances) > cls.MAX_CACHED:
+                cls._instances.popitem(last=False)
+        return layout
+
+    def cell_at(self, x, y):
+        """0-based (column, row) of the cell containing picture point (x, y), or None outside it"""
+        column = self._cell_index(x, self.width, self.cell_width, self.x_lines, self.columns)
+        row = self._cell_index(y, self.height, self.cell_height, self.y_lines, self.rows)
+        if column is None or row is None:
+            return None
+        return column, row
+
+    @staticmethod
+    def _cell_index(position, length, spacing, lines, count):
+        if not 0 <= position < length:
+            return None
+        index = int(position / spacing)
+        # Lines are rounded to whole pixels, so a boundary is at most one cell off the division
+        if index < len(lines) and position < lines[index]:
+            index -= 1
+        elif index + 1 < len(lines) and position >= lines[index + 1]:
+            index += 1
+        return min(max(index, 0), count - 1)
 
 
 class GridRenderer:
-    def __init__(self):
-        pass
-    
+    """Draws the on-screen grid and coordinate labels.
+
+    Line and label items are kept in pools and updated in place, and only
+    the ones within DRAW_MARGIN pixels of the visible canvas are drawn, so
+    a redraw costs in proportion to what is on screen rather than to the
+    number of cells in the image.
+
+    When more than RASTER_LINE_THRESHOLD lines would be drawn, the grid is
+    instead rasterized with the exporter's line drawing into one
+    transparent image item, so dense grids cost the same as sparse ones.
+    display_mode 'vector' or 'raster' forces either path.
+
+    When zoomed out far enough that lines or labels would crowd together,
+    only every Nth one is drawn (N from LOD_STRIDES). Every
+    MAJOR_EVERY-th drawn line keeps the full thickness and the lines in
+    between are drawn thin, so the culled grid still reads as a grid.
+    """
+
+    # Lines and labels are drawn this far past the canvas edges so short
+    # pans can just move the existing items
+    DRAW_MARGIN = 256
+    RASTER_LINE_THRESHOLD = 300
+    # Level of detail: minimum on-screen spacing of drawn lines, in pixels
+    MIN_LINE_SPACING = 4
+    LOD_STRIDES = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+    MAJOR_EVERY = 5
+    # Rough label extents per point of font size, used to keep labels apart
+    LABEL_CHAR_WIDTH = 0.8
+    LABEL_LINE_HEIGHT = 1.4
+    LABEL_GAP = 4
+
+    def __init__(self, display_mode='auto'):
+        # Named Tk fonts by size, so label items share one font instead of parsing a spec each
+        self.canvas_fonts = {}
+        self.display_mode = display_mode
+        self.line_pool = None
+        self.label_pool = None
+        self.raster_pool = None
+        self.raster_key = None
+        self.raster_photo = None
+        self.pan_offset = (0, 0)
 
-    
-    def draw_grid_on_canvas(self, canvas, img_x, img_y, scaled_width, scaled_height, 
-                           scaled_grid_width, scaled_grid_height, line_thickness, grid_color, canvas_zoom_factor):
+    def _pools(self, canvas):
+        if self.line_pool is None or self.line_pool.canvas is not canvas:
+            # One tag per pool: a pool's move and restyle act on its tag
+            self.line_pool = CanvasItemPool(canvas, 'line', "grid_line_tag")
+            self.label_pool = CanvasItemPool(canvas, 'text', "coordinate_tag")
+            self.raster_pool = CanvasItemPool(canvas, 'image', "grid_raster_tag")
+            self.raster_key = None
+
+    @staticmethod
+    def _visible_steps(origin, count, step, low, high, stride=1):
+        """Multiples of stride in [0, count] with origin + i * step inside [low, high]"""
+        if high is None:
+            return range(0, count + 1, stride)
+        first = max(0, int((low - origin) // step) - 1)
+        last = min(count, int((high - origin) // step) + 1)
+        return range(-(-first // stride) * stride, last + 1, stride)
+
+    def lod_stride(self, spacing, min_spacing):
+        """Smallest stride from LOD_STRIDES that puts drawn items min_spacing pixels apart"""
+        for stride in self.LOD_STRIDES:
+            if spacing * stride >= min_spacing:
+                return stride
+        return self.LOD_STRIDES[-1]
+
+    def _clip_range(self, view_size):
+        if view_size is None:
+            return None, None
+        return -self.DRAW_MARGIN, view_size + self.DRAW_MARGIN
+
+    def draw_grid_on_canvas(self, canvas, img_x, img_y, layout, line_thickness, grid_color, canvas_zoom_factor,
+                           view_width=None, view_height=None):
+        """Draw the lines of a GridLayout with the picture's top left corner at (img_x, img_y)"""
         # Ensure line thickness remains constant in pixels regardless of zoom
         pixel_line_thickness = max(1, int(line_thickness))
-        
-        # Draw vertical lines - snap to integer pixels to avoid anti-aliasing
-        for x_unzoomed in range(0, scaled_width + 1, scaled_grid_width):
-            x_pos = int(img_x + (x_unzoomed * canvas_zoom_factor))
-            y_start = int(img_y)
-            y_end = int(img_y + (scaled_height * canvas_zoom_factor))
-            canvas.create_line(x_pos, y_start, x_pos, y_end,
-                              width=pixel_line_thickness, fill=grid_color, tags="grid_tag")
-
-        # Draw horizontal lines - snap to integer pixels to avoid anti-aliasing
-        for y_unzoomed in range(0, scaled_height + 1, scaled_grid_height):
-            y_pos = int(img_y + (y_unzoomed * canvas_zoom_factor))
-            x_start = int(img_x)
-            x_end = int(img_x + (scaled_width * canvas_zoom_factor))
-            canvas.create_line(x_start, y_pos, x_end, y_pos,
-                              width=pixel_line_thickness, fill=grid_color, tags="grid_tag")
-    
-    def draw_coordinates_on_canvas(self, canvas, img_x, img_y, scaled_width, scaled_height,
-                                  scaled_grid_width, scaled_grid_height, canvas_zoom_factor):
-        font_size = max(8, min(12, min(scaled_grid_width, scaled_grid_height) // 4))
-
-        # Draw column numbers - snap to integer pixels to avoid anti-aliasing
-        for x_unzoomed in range(0, scaled_width, scaled_grid_width):
-            col_num = x_unzoomed // scaled_grid_width + 1
-            cell_center_x = int(img_x + (x_unzoomed + scaled_grid_width // 2) * canvas_zoom_factor)
-            canvas.create_text(cell_center_x, int(img_y - 15), # -15 offset for text position
-                              text=str(col_num), fill="blue",
-                              font=("Arial", font_size), tags="coordinate_tag")
-
-        # Draw row numbers - snap to integer pixels to avoid anti-aliasing
-        for y_unzoomed in range(0, scaled_height, scaled_grid_height):
-            row_num = y_unzoomed // scaled_grid_height + 1
-            cell_center_y = int(img_y + (y_unzoomed + scaled_grid_height // 2) * canvas_zoom_factor)
-            canvas.create_text(int(img_x - 15), cell_center_y, # -15 offset for text position
-                              text=str(row_num), fill="blue",
-                              font=("Arial", font_size), tags="coordinate_tag")
-
-
-class GridExporter:
-    def __init__(self):
-        pass
-    
-
-    
-    def export_image_with_grid(self, original_image, file_path, grid_width, grid_height, 
-                              line_thickness, grid_color, resize_factor, dpi=96):
-        img_width, img_height = original_image.size
-        
-        export_width = int(img_width * resize_factor)
-        export_height = int(img_height * resize_factor)
-        
-        # Grid dimensions should remain constant in actual units
-        scaled_grid_width = grid_width
-        scaled_grid_height = grid_height
-        # Ensure line thickness is integer pixels
-        scaled_line_thickness = max(1, int(line_thickness))
-        
-        # Calculate number of cells to determine margin requirements
-        num_cols = export_width // scaled_grid_width
-        num_rows = export_height // scaled_grid_height
-        
-        try:
-            # Scale font size based on grid dimensions and zoom factor
-            font_size = max(10, min(16, min(scaled_grid_width, scaled_grid_height) // 3))
-            font = ImageFont.truetype("arial.ttf", font_size)
-        except IOError:
-            font = ImageFont.load_default()
-        
-        # Calculate required margins based on actual text dimensions
-        draw_temp = ImageDraw.Draw(Image.new('RGB', (100, 100)))
-        
-        # Test longest column number (highest number)
-        max_col_text = str(num_cols)
-        col_text_width, col_text_height = draw_temp.textsize(max_col_text, font=font) if hasattr(
-            draw_temp, 'textsize') else (len(max_col_text) * font_size // 2, font_size)
-        
-        # Test longest row number
-        max_row_text = str(num_rows)
-        row_text_width, row_text_height = draw_temp.textsize(max_row_text, font=font) if hasattr(
-            draw_temp, 'textsize') else (len(max_row_text) * font_size // 2, font_size)
-        
-        # Calculate margins with padding
-        top_margin = col_text_height + 10  # 10px padding
-        left_margin = row_text_width + 10  # 10px padding
-        
-        # Use LANCZOS for consistent scaling with canvas display
-        resized_image = original_image.resize((export_width, export_height), Image.LANCZOS)
-        
-        export_image = Image.new('RGBA', (export_width + left_margin + 10, export_height + top_margin + 10), (255, 255, 255, 255))
-        export_image.paste(resized_image, (left_margin, top_margin))
-        
-        draw = ImageDraw.Draw(export_image)
-        
-        # Draw vertical grid lines (crisp, pixel-aligned)
-        for x in range(0, export_width + 1, scaled_grid_width):
-            x_pos = int(x + left_margin)
-            draw.line([(x_pos, int(top_margin)), (x_pos, int(export_height + top_margin))],
-                     fill=grid_color, width=scaled_line_thickness)
-        
-        # Draw horizontal grid lines (crisp, pixel-aligned)
-        for y in range(0, export_height + 1, scaled_grid_height):
-            y_pos = int(y + top_margin)
-            draw.line([(int(left_margin), y_pos), (int(export_width + left_margin), y_pos)],
-                     fill=grid_color, width=scaled_line_thickness)
-        
-        # Draw column numbers using scaled grid dimensions - snap to integer pixels
-        for x in range(0, export_width, scaled_grid_width):
-            col_num = x // scaled_grid_width + 1
-            cell_center_x = int(x + left_margin + scaled_grid_width // 2)
-            
-            text_width, text_height = draw.textsize(str(col_num), font=font) if hasattr(
-                draw, 'textsize') else (len(str(col_num)) * font_size // 2, font_size)
-            
-            # Position column numbers above the grid - snap to integer pixels
-            draw.text(
-                (int(cell_center_x - text_width // 2), int(top_margin // 2 - text_height // 2)),
-                str(col_num),
-                fill="blue",
-                font=font
-            )
-        
-        # Draw row numbers using scaled grid dimensions - snap to integer pixels
-        for y in range(0, export_height, scaled_grid_height):
-            row_num = str(y // scaled_grid_height + 1)
-            cell_center_y = int(y + top_margin + scaled_grid_height // 2)
-            
-            text_width, text_height = draw.textsize(row_num, font=font) if hasattr(
-                draw, 'textsize') else (len(row_num) * font_size // 2, font_size)
-            
-            # Position row numbers to the left of the grid - snap to integer pixels
-            draw.text(
-                (int(left_margin // 2 - text_width // 2), int(cell_center_y - text_height // 2)),
-                row_num,
-                fill="blue",
-                font=font
-            )
-        
-        # Save with correct DPI for accurate measurements
-        try:
-            export_image.save(file_path, dpi=(dpi, dpi))
-        except Exception as e:
-            # Fallback: save without DPI if there's an error
-            export_image.save(file_path)
-        return True
\ No newline at end of file
+        major = {'width': pixel_line_thickness, 'fill': grid_color}
+        minor = {'width': 1, 'fill': grid_color}
+        x_low, x_high = self._clip_range(view_width)
+        y_low, y_high = self._clip_range(view_height)
+
+        # Snap to integer pixels to avoid anti-aliasing; floor so that a redraw
+        # lands exactly where panning moved the previous items
+        y_start = math.floor(img_y)
+        y_end = math.floor(img_y + (layout.height * canvas_zoom_factor))
+        x_start = math.floor(img_x)
+        x_end = math.floor(img_x + (layout.width * canvas_zoom_factor))
+        if x_high is not None:
+            # Clip the long axis of each line to the drawn area as well
+            y_start, y_end = max(y_start, y_low), min(y_end, y_high)
+            x_start, x_end = max(x_start, x_low), min(x_end, x_high)
+
+        specs = []
+        if y_start < y_end:
+            # Vertical lines
+            lines = layout.x_lines
+            step = layout.cell_width * canvas_zoom_factor
+            stride = self.lod_stride(step, self.MIN_LINE_SPACING)
+            major_stride = stride * self.MAJOR_EVERY if stride > 1 else 1
+            for i in self._visible_steps(img_x, len(lines) - 1, step, x_low, x_high, stride):
+                x_pos = math.floor(img_x + lines[i] * canvas_zoom_factor)
+                if x_high is None or x_low <= x_pos <= x_high:
+                    specs.append(((x_pos, y_start, x_pos, y_end), major if i % major_stride == 0 else minor))
+
+        if x_start < x_end:
+            # Horizontal lines
+            lines = layout.y_lines
+            step = layout.cell_height * canvas_zoom_factor
+            stride = self.lod_stride(step, self.MIN_LINE_SPACING)
+            major_stride = stride * self.MAJOR_EVERY if stride > 1 else 1
+            for i in self._visible_steps(img_y, len(lines) - 1, step, y_low, y_high, stride):
+                y_pos = math.floor(img_y + lines[i] * canvas_zoom_factor)
+                if y_high is None or y_low <= y_pos <= y_high:
+                    specs.append(((x_start, y_pos, x_end, y_pos), major if i % major_stride == 0 else minor))
+
+        self._pools(canvas)
+        if self.use_raster(len(specs), view_width):
+            self.line_pool.clear()
+            self._draw_raster_grid(specs, (x_start, y_start, x_end, y_end), grid_color,
+                                   view_width, view_height)
+        else:
+            self.raster_pool.clear()
+            self.raster_key = self.raster_photo = None
+            self.line_pool.update(specs)
+        self.pan_offset = (0, 0)
+
+    def use_raster(self, line_count, view_width=None):
+        """Whether a grid of line_count lines is drawn as one image rather than as line items"""
+        if view_width is None or self.display_mode == 'vector':
+            return False
+        return self.display_mode == 'raster' or line_count > self.RASTER_LINE_THRESHOLD
+
+    def _draw_raster_grid(self, specs, bounds, grid_color, view_width, view_height):
+        """Show the lines in specs, spanning bounds, as one image covering the view and its margin"""
+        margin = self.DRAW_MARGIN
+        size = (view_width + 2 * margin, view_height + 2 * margin)
+        key = (size, bounds, grid_color, tuple((coords, options['width']) for coords, options in specs))
+        if key != self.raster_key:
+            # Imported here so exporting never needs tkinter
+            from PIL import ImageTk
+
+            left, top, right, bottom = (value + margin for value in bounds)
+            layer = Image.new('RGBA', size, (0, 0, 0, 0))
+            # Thin minor lines first so major lines are drawn over them
+            for width in sorted({options['width'] for _, options in specs}):
+                lines = [coords for coords, options in specs if options['width'] == width]
+                draw_grid_lines(
+                    layer,
+                    [x0 + margin for x0, y0, x1, y1 in lines if x0 == x1 and y0 != y1],
+                    [y0 + margin for x0, y0, x1, y1 in lines if y0 == y1 and x0 != x1],
+                    left, top, right, bottom, width, grid_color)
+            self.raster_photo = ImageTk.PhotoImage(layer)
+            self.raster_key = key
+        self.raster_pool.update([((-margin, -margin), {'image': self.raster_photo, 'anchor': 'nw'})])
+
+    def canvas_font(self, canvas, font_size):
+        font = self.canvas_fonts.get(font_size)
+        if font is None:
+            # Imported here so exporting never needs tkinter
+            from tkinter import font as tkfont
+            font = tkfont.Font(root=canvas, family="Arial", size=font_size)
+            self.canvas_fonts[font_size] = font
+        return font
+
+    def draw_coordinates_on_canvas(self, canvas, img_x, img_y, layout, canvas_zoom_factor,
+                                  view_width=None, view_height=None):
+        """Draw the column and row numbers of a GridLayout beside the picture"""
+        font_size = int(max(8, min(12, min(layout.cell_width, layout.cell_height) // 4)))
+        font = self.canvas_font(canvas, font_size)
+        x_low, x_high = self._clip_range(view_width)
+        y_low, y_high = self._clip_range(view_height)
+
+        specs = []
+        # Column numbers - snap to integer pixels to avoid anti-aliasing
+        label_y = math.floor(img_y - 15)  # -15 offset for text position
+        if y_high is None or y_low <= label_y <= y_high:
+            centers = layout.x_centers
+            step = layout.cell_width * canvas_zoom_factor
+            # Skip labels that would overlap their neighbours
+            label_width = len(str(layout.columns)) * font_size * self.LABEL_CHAR_WIDTH + self.LABEL_GAP
+            stride = self.lod_stride(step, label_width)
+            for col in self._visible_steps(img_x + step / 2, layout.columns - 1, step, x_low, x_high, stride):
+                cell_center_x = math.floor(img_x + centers[col] * canvas_zoom_factor)
+                if x_high is None or x_low <= cell_center_x <= x_high:
+                    specs.append(((cell_center_x, label_y),
+                                  {'text': str(col + 1), 'fill': "blue", 'font': font}))
+
+        # Row numbers - snap to integer pixels to avoid anti-aliasing
+        label_x = math.floor(img_x - 15)  # -15 offset for text position
+        if x_high is None or x_low <= label_x <= x_high:
+            centers = layout.y_centers
+            step = layout.cell_height * canvas_zoom_factor
+            stride = self.lod_stride(step, font_size * self.LABEL_LINE_HEIGHT + self.LABEL_GAP)
+            for row in self._visible_steps(img_y + step / 2, layout.rows - 1, step, y_low, y_high, stride):
+                cell_center_y = math.floor(img_y + centers[row] * canvas_zoom_factor)
+                if y_high is None or y_low <= cell_center_y <= y_high:
+                    specs.append(((label_x, cell_center_y),
+                                  {'text': str(row + 1), 'fill': "blue", 'font': font}))
+
+        self._pools(canvas)
+        self.label_pool.update(specs)
+        self.pan_offset = (0, 0)
+
+    def recolor(self, canvas, grid_color):
+        """Change the color of the drawn grid lines in place.
+
+        Returns False when the grid is shown rasterized, in which case it
+        has to be drawn again instead.
+        """
+        self._pools(canvas)
+        if self.raster_pool.items:
+            return False
+        self.line_pool.restyle(fill=grid_color)
+        return True
+
+    def pan(self, canvas, dx, dy):
+        """Move the drawn grid and labels by (dx, dy).
+
+        Returns True once the pan has gone far enough that parts of the
+        view may be outside what was drawn, i.e. the grid needs a redraw.
+        """
+        self._pools(canvas)
+        for pool in (self.line_pool, self.label_pool, self.raster_pool):
+            pool.move(dx, dy)
+        self.pan_offset = (self.pan_offset[0] + dx, self.pan_offset[1] + dy)
+        return max(abs(self.pan_offset[0]), abs(self.pan_offset[1])) > self.DRAW_MARGIN // 2
+
+    def clear(self):
+        if self.line_pool is not None:
+            for pool in (self.line_pool, self.label_pool, self.raster_pool):
+                pool.clear()
+            self.raster_key = self.raster_photo = None
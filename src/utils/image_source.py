@@ -0,0 +1,199 @@
+"""Pixel sources behind ImageProcessor and GridExporter.
+
+An ImageSource hands out rectangular regions of an image. PILImageSource
+wraps an ordinary Pillow image. MappedImageSource reads uncompressed pixels
+straight out of a memory-mapped file (raw RGB/RGBA/L buffers and striped or
+tiled uncompressed TIFFs), so only the rows a viewport or export strip
+touches are ever paged in.
+
+Raw buffers have no header, so their size comes from the file name
+(scan_12000x9000.rgb) and their mode from the extension (RAW_EXTENSIONS).
+"""
+import math
+import mmap
+import os
+import re
+import threading
+
+from PIL import Image
+
+
+BYTES_PER_PIXEL = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+# Headerless pixel buffers and the mode of their samples
+RAW_EXTENSIONS = {'.raw': 'RGB', '.rgb': 'RGB', '.rgba': 'RGBA', '.gray': 'L'}
+RAW_SIZE_PATTERN = re.compile(r'(\d+)x(\d+)', re.IGNORECASE)
+
+# Extra source pixels read around a region so resampling filters see the
+# same neighbours as when resizing the whole image (LANCZOS support is 3)
+FILTER_SUPPORT = 3
+
+
+class ImageSource:
+    in_memory = True
+
+    def __init__(self, size, mode, info=None):
+        self.size = size
+        self.mode = mode
+        self.info = info or {}
+
+    @property
+    def width(self):
+        return self.size[0]
+
+    @property
+    def height(self):
+        return self.size[1]
+
+    def read_region(self, box):
+        """Return the integer (left, top, right, bottom) box as a PIL image"""
+        raise NotImplementedError
+
+    def to_image(self):
+        """Return the whole image as a PIL image (decodes everything)"""
+        return self.read_region((0, 0, self.width, self.height))
+
+    def resize_region(self, size, resample=Image.LANCZOS, box=None):
+        """Resample the float source `box` to `size`, like Image.resize(size, resample, box=box),
+        reading only the source pixels the filter needs."""
+        box = box or (0, 0, self.width, self.height)
+        left, top, right, bottom = box
+        margin_x = math.ceil(FILTER_SUPPORT * max(1.0, (right - left) / size[0])) + 1
+        margin_y = math.ceil(FILTER_SUPPORT * max(1.0, (bottom - top) / size[1])) + 1
+        read_box = (max(0, int(left) - margin_x), max(0, int(top) - margin_y),
+                    min(self.width, math.ceil(right) + margin_x),
+                    min(self.height, math.ceil(bottom) + margin_y))
+        region = self.read_region(read_box)
+        return region.resize(size, resample, box=(left - read_box[0], top - read_box[1],
+                                                  right - read_box[0], bottom - read_box[1]))
+
+    def close(self):
+        pass
+
+    def reduced(self, factor, band_rows=None):
+        """Return the image shrunk by an integer factor, built band by band"""
+        band_rows = band_rows or max(factor, (256 // factor) * factor)
+        width, height = self.width // factor, self.height // factor
+        result = Image.new(self.mode, (max(1, width), max(1, height)))
+        for top in range(0, height * factor, band_rows):
+            bottom = min(top + band_rows, height * factor)
+            band = self.read_region((0, top, width * factor, bottom))
+            result.paste(band.reduce(factor), (0, top // factor))
+        return result
+
+
+class PILImageSource(ImageSource):
+    def __init__(self, image):
+        super().__init__(image.size, image.mode, image.info)
+        self.image = image
+        # Tile workers, the background decode and exports may all read at once
+        self.load_lock = threading.Lock()
+
+    def load(self):
+        """Return the image with its pixels decoded; Pillow's lazy load is not thread safe"""
+        with self.load_lock:
+            self.image.load()
+        return self.image
+
+    def read_region(self, box):
+        return self.load().crop(box)
+
+    def to_image(self):
+        return self.load()
+
+    def resize_region(self, size, resample=Image.LANCZOS, box=None):
+        return self.load().resize(size, resample, box=box)
+
+    def close(self):
+        self.image.close()
+
+
+class MappedImageSource(ImageSource):
+    """Uncompressed pixels read from a memory-mapped file.
+
+    `chunks` lists (left, top, right, bottom, offset, stride) for each
+    block of pixel rows in the file: one block for a raw buffer, one per
+    strip or tile for a TIFF.
+    """
+
+    in_memory = False
+
+    def __init__(self, file_path, size, mode, chunks, info=None):
+        if mode not in BYTES_PER_PIXEL:
+            raise ValueError(f"Unsupported mode for a mapped image: {mode}")
+        super().__init__(size, mode, info)
+        self.file_path = file_path
+        self.chunks = chunks
+        with open(file_path, 'rb') as f:
+            self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def read_region(self, box):
+        left, top, right, bottom = (int(v) for v in box)
+        bpp = BYTES_PER_PIXEL[self.mode]
+        region = Image.new(self.mode, (max(1, right - left), max(1, bottom - top)))
+        for chunk_left, chunk_top, chunk_right, chunk_bottom, offset, stride in self.chunks:
+            x0, x1 = max(left, chunk_left), min(right, chunk_right)
+            y0, y1 = max(top, chunk_top), min(bottom, chunk_bottom)
+            if x0 >= x1 or y0 >= y1:
+                continue
+            start = offset + (x0 - chunk_left) * bpp
+            row_bytes = (x1 - x0) * bpp
+            data = b''.join(
+                self.map[start + (y - chunk_top) * stride:start + (y - chunk_top) * stride + row_bytes]
+                for y in range(y0, y1))
+            region.paste(Image.frombytes(self.mode, (x1 - x0, y1 - y0), data), (x0 - left, y0 - top))
+        return region
+
+    def close(self):
+        self.map.close()
+
+
+def raw_image_source(file_path, width, height, mode='RGB', offset=0):
+    """Map a headerless buffer of width x height pixels in the given mode"""
+    stride = width * BYTES_PER_PIXEL[mode]
+    if os.path.getsize(file_path) < offset + stride * height:
+        raise ValueError(f"{file_path} is smaller than {width}x{height} {mode}")
+    return MappedImageSource(file_path, (width, height), mode, [(0, 0, width, height, offset, stride)])
+
+
+def open_image_source(file_path):
+    """Open file_path as a mapped source when its pixels are stored uncompressed, else via PIL"""
+    stem, extension = os.path.splitext(os.path.basename(file_path))
+    if extension.lower() in RAW_EXTENSIONS:
+        sizes = RAW_SIZE_PATTERN.findall(stem)
+        if not sizes:
+            raise ValueError(f"{file_path}: raw images need their size in the name, e.g. scan_4000x3000{extension}")
+        width, height = sizes[-1]
+        return raw_image_source(file_path, int(width), int(height), RAW_EXTENSIONS[extension.lower()])
+
+    image = Image.open(file_path)
+    chunks = _mappable_tiff_chunks(image)
+    if chunks is None:
+        return PILImageSource(image)
+    info, size, mode = dict(image.info), image.size, image.mode
+    image.close()
+    return MappedImageSource(file_path, size, mode, chunks, info)
+
+
+def as_image_source(image):
+    """Accept either an ImageSource or a PIL image"""
+    return image if isinstance(image, ImageSource) else PILImageSource(image)
+
+
+def _mappable_tiff_chunks(image):
+    if image.format != 'TIFF' or image.mode not in BYTES_PER_PIXEL or not image.tile:
+        return None
+    if getattr(image, 'n_frames', 1) > 1:
+        return None
+
+    bpp = BYTES_PER_PIXEL[image.mode]
+    chunks = []
+    for tile in image.tile:
+        codec, extents, offset, args = tile
+        rawmode, stride, ystep = args
+        # Only plain top-down chunky samples in the image's own layout map directly
+        if codec != 'raw' or rawmode != image.mode or ystep != 1:
+            return None
+        left, top, right, bottom = extents
+        chunks.append((left, top, right, bottom, offset, stride or (right - left) * bpp))
+    return chunks
@@ -1,41 +1,303 @@
-from PIL import Image, ImageTk
+from PIL import Image
 import os
+import threading
+
+from src.utils.image_source import ImageSource, open_image_source
 
 
 class ImageProcessor:
+    # Stop halving once a level's shorter side would drop below this
+    PYRAMID_MIN_SIZE = 256
+    # Largest pyramid level kept in memory for memory-mapped sources
+    MAX_LEVEL_PIXELS = 16_000_000
+
     def __init__(self):
-        self.original_image = None
+        self.source = None
         self.displayed_image = None
         self.image_path = None
-    
-    def load_image(self, file_path):
+        self.pyramid = []
+        # Background full-resolution decode started by load_image
+        self.loader_thread = None
+        self.loaded_pyramid = None
+        # Memory-mapped pyramid levels from a project cache
+        self.cached_levels = []
+        # Sources still in use by the loader or exports, with their number of users
+        self.source_users = {}
+        self.source_lock = threading.Lock()
+        # Held while a tile worker builds the pyramid, so only one does
+        self.pyramid_lock = threading.Lock()
+
+    def load_image(self, file_path, preview_size=None, cached_levels=None):
+        """Open an image for display.
+
+        With preview_size, formats that support it (JPEG) are first decoded
+        at a reduced scale of at least preview_size using Pillow's draft
+        mode. That preview is shown right away while the full resolution
+        decodes in a background thread; poll_full_image swaps it in.
+
+        cached_levels, [(scale, ImageSource)] from a project's pyramid
+        cache, are used as the pyramid straight away; only the full
+        resolution level is still decoded in the background.
+        """
         if not file_path:
             return False
-        
+
         try:
-            self.original_image = Image.open(file_path)
-            self.image_path = file_path
-            return True
+            source = open_image_source(file_path)
+            preview = None
+            if preview_size and source.in_memory and not cached_levels:
+                preview = Image.open(file_path)
+                if preview.draft('RGB', preview_size) is None:
+                    preview = None
+                else:
+                    preview.load()
         except Exception as e:
             print(f"Error loading image: {e}")
             return False
-    
+
+        self.close_cached_levels()
+        with self.source_lock:
+            previous, self.source = self.source, source
+            # A source someone still reads is closed by its last release_source
+            close_previous = previous is not None and previous not in self.source_users
+        if close_previous:
+            previous.close()
+        self.image_path = file_path
+        self.pyramid = []
+        self.loaded_pyramid = None
+
+        if cached_levels:
+            self.pyramid = list(cached_levels)
+            self.cached_levels = list(cached_levels)
+        elif preview is not None:
+            # Serve everything from the preview until the full decode is in
+            self.pyramid = [(preview.width / source.width, self._display_mode(preview))]
+
+        if self.pyramid and source.in_memory:
+            self.loader_thread = threading.Thread(
+                target=self._decode_full, args=(self.acquire_source(), cached_levels), daemon=True)
+            self.loader_thread.start()
+        else:
+            self.loader_thread = None
+        return True
+
+    def close_cached_levels(self):
+        for _, level in self.cached_levels:
+            level.close()
+        self.cached_levels = []
+
+    def release_cached_levels(self, cache_dir):
+        """Close the cached levels mapped from cache_dir and drop them from the pyramid.
+
+        Their files can then be replaced (Windows refuses while they are
+        mapped). The remaining levels, or a rebuilt pyramid, serve instead.
+        Returns True if any level was released.
+        """
+        cache_dir = os.path.abspath(cache_dir)
+        released = [level for _, level in self.cached_levels
+                    if os.path.dirname(os.path.abspath(level.file_path)) == cache_dir]
+        if not released:
+            return False
+        self.cached_levels = [(scale, level) for scale, level in self.cached_levels
+                              if level not in released]
+        self.pyramid = [(scale, level) for scale, level in self.pyramid if level not in released]
+        if self.loaded_pyramid is not None:
+            self.loaded_pyramid = [(scale, level) for scale, level in self.loaded_pyramid
+                                   if level not in released]
+        for level in released:
+            level.close()
+        return True
+
+    def acquire_source(self):
+        """Return the current source, kept open until release_source even if another image is loaded"""
+        with self.source_lock:
+            source = self.source
+            self.source_users[source] = self.source_users.get(source, 0) + 1
+        return source
+
+    def release_source(self, source):
+        """Give back a source from acquire_source; closes it if it was replaced meanwhile"""
+        with self.source_lock:
+            users = self.source_users.pop(source) - 1
+            if users:
+                self.source_users[source] = users
+            if users or source is self.source:
+                return
+        source.close()
+
+    def _decode_full(self, source, cached_levels=None):
+        try:
+            if cached_levels:
+                # The reduced levels are already there; only full resolution is missing
+                base = self._display_mode(source.to_image())
+                base.load()
+                pyramid = [(1.0, base)] + list(cached_levels)
+            else:
+                pyramid = self.make_pyramid(source)
+        except Exception as e:
+            if source is self.source:
+                print(f"Error decoding image: {e}")
+            return
+        finally:
+            self.release_source(source)
+        # Ignore the result if another image was loaded meanwhile
+        if source is self.source:
+            self.loaded_pyramid = pyramid
+
+    @property
+    def loading(self):
+        return self.loader_thread is not None and self.loader_thread.is_alive()
+
+    def poll_full_image(self):
+        """Swap in the full resolution pyramid once decoded; True if that just happened"""
+        if self.loaded_pyramid is None or self.loading:
+            return False
+        self.pyramid, self.loaded_pyramid = self.loaded_pyramid, None
+        self.loader_thread = None
+        return True
+
+    def get_loaded_source(self):
+        """Return the image source, waiting for a background decode to finish"""
+        if self.loader_thread is not None:
+            self.loader_thread.join()
+        return self.source
+
     def get_image_info(self):
-        if self.original_image:
+        if self.source:
             return {
-                'size': self.original_image.size,
+                'size': self.source.size,
                 'filename': os.path.basename(self.image_path) if self.image_path else 'None'
             }
         return None
-    
+
+    def _display_mode(self, image):
+        if image.mode not in ('RGB', 'RGBA', 'L'):
+            has_alpha = image.mode in ('LA', 'PA') or 'transparency' in image.info
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        return image
+
+    def make_pyramid(self, source):
+        """Return the 1/2, 1/4, ... mip levels of source with their scales.
+
+        Mapped sources stay on disk: their first level is the largest
+        power-of-two reduction under MAX_LEVEL_PIXELS, built band by band.
+        """
+        if source.in_memory:
+            base = self._display_mode(source.to_image())
+            # Decode up front so concurrent readers never trigger a lazy load
+            base.load()
+        else:
+            factor = 1
+            while (source.width // factor) * (source.height // factor) > self.MAX_LEVEL_PIXELS:
+                factor *= 2
+            base = source.reduced(factor) if factor > 1 else source.to_image()
+
+        # Each level is stored with its scale relative to the original width
+        pyramid = [(base.width / source.width, base)]
+        level = base
+        while min(level.size) // 2 >= self.PYRAMID_MIN_SIZE:
+            level = level.reduce(2)
+            pyramid.append((level.width / source.width, level))
+        return pyramid
+
+    def build_pyramid(self):
+        """Precompute the mip levels of the loaded image and return them"""
+        source = self.acquire_source()
+        try:
+            pyramid = self.make_pyramid(source)
+        finally:
+            self.release_source(source)
+        # Not installed if another image was loaded while building
+        if source is self.source:
+            self.pyramid = pyramid
+        return pyramid
+
+    def get_pyramid(self):
+        """Return the pyramid, building it on first use (normally on a tile worker thread)"""
+        pyramid = self.pyramid
+        if not pyramid:
+            with self.pyramid_lock:
+                pyramid = self.pyramid or self.build_pyramid()
+        return pyramid
+
+    def select_level(self, scale):
+        """Return the smallest pyramid level that is still at least `scale` big"""
+        pyramid = self.get_pyramid()
+        for level_scale, level in reversed(pyramid):
+            if level_scale >= scale:
+                return level_scale, level
+        return pyramid[0]
+
+    def get_resized(self, width, height, resample=Image.LANCZOS):
+        """Return the original image resampled to width x height.
+
+        The result comes from the nearest pyramid level with a single
+        resample. It is not cached here: TileRenderer keeps the rendered
+        tiles per zoom level.
+        """
+        if self.source is None:
+            return None
+
+        width, height = max(1, int(width)), max(1, int(height))
+        level_scale, level = self.select_level(width / self.source.width)
+        if level_scale < width / self.source.width and not self.source.in_memory:
+            # Zoomed in past the in-memory levels of a mapped source
+            resized_image = self.source.resize_region((width, height), resample)
+        elif isinstance(level, ImageSource):
+            # A memory-mapped level from a project cache
+            resized_image = level.resize_region((width, height), resample)
+        elif level.size == (width, height):
+            resized_image = level
+        else:
+            resized_image = level.resize((width, height), resample)
+        return resized_image
+
+    def visible_region(self, scaled_width, scaled_height, img_x, img_y, view_width, view_height):
+        """Return the (left, top, right, bottom) part of the scaled image inside the view.
+
+        Coordinates are in scaled image pixels; None if nothing is visible.
+        """
+        left = max(0, int(-img_x))
+        top = max(0, int(-img_y))
+        right = min(scaled_width, int(view_width - img_x) + 1)
+        bottom = min(scaled_height, int(view_height - img_y) + 1)
+        if right <= left or bottom <= top:
+            return None
+        return left, top, right, bottom
+
+    def render_region(self, scaled_width, scaled_height, box, resample=Image.LANCZOS):
+        """Render `box` of the image as it would look scaled to scaled_width x scaled_height.
+
+        Only the matching source rectangle of the nearest pyramid level is
+        resampled, so the cost depends on the box size and not on the zoom.
+        """
+        if self.source is None:
+            return None
+
+        left, top, right, bottom = box
+        if (left, top, right, bottom) == (0, 0, scaled_width, scaled_height):
+            return self.get_resized(scaled_width, scaled_height, resample)
+
+        level_scale, level = self.select_level(scaled_width / self.source.width)
+        if level_scale < scaled_width / self.source.width and not self.source.in_memory:
+            # Read just this region at full resolution from the mapped file
+            level = self.source
+
+        # Map the box back into the chosen level's pixel space
+        scale_x = level.width / scaled_width
+        scale_y = level.height / scaled_height
+        source_box = (left * scale_x, top * scale_y, right * scale_x, bottom * scale_y)
+        if isinstance(level, ImageSource):
+            return level.resize_region((right - left, bottom - top), resample, source_box)
+        return level.resize((right - left, bottom - top), resample, box=source_box)
+
     def resize_image(self, resize_factor):
-        if self.original_image is None:
+        if self.source is None:
             return None
-        
-        img_width, img_height = self.original_image.size
+
+        img_width, img_height = self.source.size
         scaled_width = int(img_width * resize_factor)
         scaled_height = int(img_height * resize_factor)
-        
-        resized_image = self.original_image.resize(
-            (scaled_width, scaled_height), Image.LANCZOS)
-        return resized_image, scaled_width, scaled_height
\ No newline at end of file
+
+        resized_image = self.get_resized(scaled_width, scaled_height)
+        return resized_image, scaled_width, scaled_height
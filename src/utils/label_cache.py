@@ -0,0 +1,62 @@
+from collections import OrderedDict
+from functools import lru_cache
+import threading
+
+from PIL import Image, ImageColor, ImageDraw, ImageFont
+
+
+@lru_cache(maxsize=32)
+def load_font(font_size):
+    """Load the label font once per size for the lifetime of the process"""
+    try:
+        return ImageFont.truetype("arial.ttf", font_size)
+    except IOError:
+        return ImageFont.load_default()
+
+
+class LabelCache:
+    """LRU of pre-rendered coordinate label sprites.
+
+    A sprite is the coverage mask of a label string for one (font size,
+    color) pair. Stamping it with Image.paste(ink, box, mask) gives exactly
+    the pixels draw.text would, without shaping and rasterizing the string
+    again for every export.
+    """
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or self.MAX_ENTRIES
+        self.sprites = OrderedDict()
+        # The export worker and the UI thread may share one exporter
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, text, font_size, color, mode='RGBA'):
+        """Return (ink, mask, (dx, dy)) where (dx, dy) is the mask's offset from the text origin"""
+        key = (font_size, color, mode, text)
+        with self.lock:
+            sprite = self.sprites.get(key)
+            if sprite is not None:
+                self.sprites.move_to_end(key)
+                self.hits += 1
+                return sprite
+            self.misses += 1
+
+        font = load_font(font_size)
+        left, top, right, bottom = font.getbbox(text)
+        mask = Image.new('L', (max(1, right - left), max(1, bottom - top)), 0)
+        ImageDraw.Draw(mask).text((-left, -top), text, fill=255, font=font)
+        sprite = (ImageColor.getcolor(color, mode), mask, (left, top))
+
+        with self.lock:
+            self.sprites[key] = sprite
+            while len(self.sprites) > self.max_entries:
+                self.sprites.popitem(last=False)
+        return sprite
+
+    def draw(self, image, xy, text, font_size, color):
+        """Stamp a label onto `image` with its text origin at xy, like draw.text"""
+        ink, mask, (dx, dy) = self.get(text, font_size, color, image.mode)
+        image.paste(ink, (int(xy[0] + dx), int(xy[1] + dy)), mask)
@@ -0,0 +1,120 @@
+"""Minimal streaming multi-page PDF writer.
+
+Each page is either one full-page RGB image or a drawing made of PDF
+operators with embedded images and standard fonts. Pages are written to
+the file as soon as they are added and only their object offsets are
+kept, so a long document never has to be held in memory. Compressing a page is separate
+from writing it (encode_page), which lets pages be compressed in parallel
+and then written in order.
+"""
+import zlib
+
+from collections import namedtuple
+
+
+PDF_POINTS_PER_INCH = 72
+
+# A compressed page image ready to be written
+EncodedPage = namedtuple('EncodedPage', ['width', 'height', 'dpi', 'data'])
+
+# Objects 1 and 2 are the catalog and the page tree, written at the end
+CATALOG_ID = 1
+PAGES_ID = 2
+
+
+def encode_page(image, dpi, level=6):
+    """Deflate an image's RGB pixels for PdfPageWriter.add_page"""
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    return EncodedPage(image.width, image.height, dpi, zlib.compress(image.tobytes(), level))
+
+
+class PdfPageWriter:
+    def __init__(self, file_path):
+        self.file = open(file_path, 'wb')
+        self.offsets = {}
+        self.page_ids = []
+        self.next_id = PAGES_ID + 1
+        # The comment line of high bytes marks the file as binary
+        self.file.write(b'%PDF-1.4\n%\xe2\xe3\xcf\xd3\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def add_page(self, page):
+        """Append a page showing an EncodedPage at its DPI"""
+        width_pt = page.width * PDF_POINTS_PER_INCH / page.dpi
+        height_pt = page.height * PDF_POINTS_PER_INCH / page.dpi
+        content = b'q %.4f 0 0 %.4f 0 0 cm /Im0 Do Q' % (width_pt, height_pt)
+        self.add_drawing_page(width_pt, height_pt, content, {'Im0': page})
+
+    def add_drawing_page(self, width_pt, height_pt, content, images=None, fonts=None):
+        """Append a page drawn by the PDF operators in content.
+
+        images maps XObject names used with Do to EncodedPages, fonts maps
+        font names used with Tf to standard Type 1 font names (Helvetica, ...),
+        which every PDF reader has built in.
+        """
+        resources = []
+        if images:
+            image_refs = []
+            for name, image in images.items():
+                image_id = self._write_object(
+                    b'<< /Type /XObject /Subtype /Image /Width %d /Height %d /ColorSpace /DeviceRGB '
+                    b'/BitsPerComponent 8 /Filter /FlateDecode /Length %d >>'
+                    % (image.width, image.height, len(image.data)),
+                    image.data)
+                image_refs.append(b'/%s %d 0 R' % (name.encode(), image_id))
+            resources.append(b'/XObject << %s >>' % b' '.join(image_refs))
+        if fonts:
+            font_refs = []
+            for name, base_font in fonts.items():
+                font_id = self._write_object(
+                    b'<< /Type /Font /Subtype /Type1 /BaseFont /%s /Encoding /WinAnsiEncoding >>'
+                    % base_font.encode())
+                font_refs.append(b'/%s %d 0 R' % (name.encode(), font_id))
+            resources.append(b'/Font << %s >>' % b' '.join(font_refs))
+
+        content = zlib.compress(content, 6)
+        content_id = self._write_object(b'<< /Length %d /Filter /FlateDecode >>' % len(content), content)
+        page_id = self._write_object(
+            b'<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.4f %.4f] '
+            b'/Resources << %s >> /Contents %d 0 R >>'
+            % (PAGES_ID, width_pt, height_pt, b' '.join(resources), content_id))
+        self.page_ids.append(page_id)
+
+    def close(self):
+        kids = b' '.join(b'%d 0 R' % page_id for page_id in self.page_ids)
+        self._write_object(b'<< /Type /Pages /Kids [%s] /Count %d >>' % (kids, len(self.page_ids)),
+                           object_id=PAGES_ID)
+        self._write_object(b'<< /Type /Catalog /Pages %d 0 R >>' % PAGES_ID, object_id=CATALOG_ID)
+
+        # Cross-reference table: one fixed-width entry per object number
+        xref_offset = self.file.tell()
+        size = self.next_id
+        self.file.write(b'xref\n0 %d\n0000000000 65535 f \n' % size)
+        for object_id in range(1, size):
+            self.file.write(b'%010d 00000 n \n' % self.offsets[object_id])
+        self.file.write(b'trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n'
+                        % (size, CATALOG_ID, xref_offset))
+        self.file.close()
+
+    def _write_object(self, dictionary, stream=None, object_id=None):
+        if object_id is None:
+            object_id = self.next_id
+            self.next_id += 1
+        self.offsets[object_id] = self.file.tell()
+        self.file.write(b'%d 0 obj\n' % object_id)
+        self.file.write(dictionary)
+        if stream is not None:
+            self.file.write(b'\nstream\n')
+            self.file.write(stream)
+            self.file.write(b'\nendstream')
+        self.file.write(b'\nendobj\n')
+        return object_id
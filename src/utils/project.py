@@ -0,0 +1,201 @@
+"""Project files: the source image, grid settings and view, plus a pyramid cache.
+
+A project is a small JSON file (PROJECT_EXTENSION). Next to it a sidecar
+directory holds the image's preview pyramid levels as uncompressed TIFFs,
+which MappedImageSource memory-maps on reopen, so the first view needs
+neither a full decode of the source nor any resampling of it.
+
+The cache is keyed by the SHA-256 of the source file. When the file's
+size and modification time still match what the project recorded, the
+stored hash is trusted and the source is not read at all; otherwise it
+is hashed again and a mismatch discards the cache.
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from src.utils.image_source import ImageSource, MappedImageSource, open_image_source
+
+
+PROJECT_EXTENSION = '.artgrid'
+PROJECT_VERSION = 1
+CACHE_SUFFIX = '.artgrid-cache'
+MANIFEST_NAME = 'manifest.json'
+HASH_CHUNK_SIZE = 1 << 20
+
+
+def file_hash(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def source_fingerprint(file_path, known=None):
+    """Return {'size', 'mtime_ns', 'sha256'} for file_path.
+
+    If `known` (a previous fingerprint) has the same size and modification
+    time, its hash is reused instead of reading the file.
+    """
+    stat = os.stat(file_path)
+    fingerprint = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+    if known and known.get('size') == stat.st_size and known.get('mtime_ns') == stat.st_mtime_ns:
+        fingerprint['sha256'] = known['sha256']
+    else:
+        fingerprint['sha256'] = file_hash(file_path)
+    return fingerprint
+
+
+def cache_dir_for(project_path):
+    return os.path.splitext(project_path)[0] + CACHE_SUFFIX
+
+
+def save_project(project_path, image_path, settings, pyramid=None, fingerprint=None,
+                 release_cache=None):
+    """Write the project file and, given pyramid levels, its sidecar cache.
+
+    settings is a JSON-serializable dict (grid, resize, dpi, view). Levels
+    at full scale are not cached since they are the source itself.
+    release_cache(cache_dir) is called before an existing cache is
+    replaced, to close any maps of it. Returns the source fingerprint that
+    was stored.
+    """
+    fingerprint = source_fingerprint(image_path, fingerprint)
+    project_dir = os.path.dirname(os.path.abspath(project_path))
+    try:
+        relative_path = os.path.relpath(image_path, project_dir)
+    except ValueError:
+        # Different drive on Windows
+        relative_path = None
+
+    cache_dir = cache_dir_for(project_path)
+    # A cache already built for this exact source is kept as is (it may be mapped right now)
+    if pyramid and cached_source_hash(cache_dir) != fingerprint['sha256']:
+        write_pyramid_cache(cache_dir, fingerprint['sha256'],
+                            [(scale, level) for scale, level in pyramid if scale < 1.0],
+                            release_cache)
+
+    project = {
+        'version': PROJECT_VERSION,
+        'image_path': os.path.abspath(image_path),
+        'image_relative_path': relative_path,
+        'source': fingerprint,
+        'settings': settings,
+    }
+    temp_path = project_path + '.tmp'
+    with open(temp_path, 'w') as f:
+        json.dump(project, f, indent=2)
+    os.replace(temp_path, project_path)
+    return fingerprint
+
+
+def load_project(project_path):
+    """Read a project file.
+
+    Returns a dict with image_path, settings, source (fingerprint) and
+    cached_levels: a list of (scale, MappedImageSource) from the sidecar
+    cache, or None when there is no cache or it belongs to another
+    version of the source.
+    """
+    with open(project_path) as f:
+        project = json.load(f)
+    if project.get('version') != PROJECT_VERSION:
+        raise ValueError(f"Unsupported project version: {project.get('version')}")
+
+    # Prefer the path relative to the project so moved folders keep working
+    image_path = project['image_path']
+    relative_path = project.get('image_relative_path')
+    if relative_path:
+        candidate = os.path.join(os.path.dirname(os.path.abspath(project_path)), relative_path)
+        if os.path.exists(candidate):
+            image_path = candidate
+    if not os.path.exists(image_path):
+        raise FileNotFoundError(f"Source image not found: {image_path}")
+
+    fingerprint = source_fingerprint(image_path, project.get('source'))
+    cached_levels = read_pyramid_cache(cache_dir_for(project_path), fingerprint['sha256'])
+    return {
+        'image_path': image_path,
+        'settings': project.get('settings', {}),
+        'source': fingerprint,
+        'cached_levels': cached_levels,
+    }
+
+
+def cached_source_hash(cache_dir):
+    """Hash of the source the cache in cache_dir was built from, or None"""
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            return json.load(f).get('source_sha256')
+    except (OSError, ValueError):
+        return None
+
+
+def write_pyramid_cache(cache_dir, source_hash, levels, release_cache=None):
+    """Store levels [(scale, PIL image)] for the source with the given hash.
+
+    The levels are written to a temporary directory first, since they may
+    be read from the very cache being replaced. release_cache(cache_dir)
+    then closes any maps of the old cache before the new one is swapped in.
+    """
+    temp_dir = cache_dir + '.tmp'
+    old_dir = cache_dir + '.old'
+    shutil.rmtree(temp_dir, ignore_errors=True)
+    os.makedirs(temp_dir)
+    try:
+        _write_levels(temp_dir, source_hash, levels)
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    if release_cache is not None:
+        release_cache(cache_dir)
+    # A directory cannot be replaced while it has files in it, so move the old one aside
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.isdir(cache_dir):
+        os.replace(cache_dir, old_dir)
+    os.replace(temp_dir, cache_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+
+
+def _write_levels(cache_dir, source_hash, levels):
+
+    entries = []
+    for index, (scale, level) in enumerate(levels):
+        name = f"level{index}.tif"
+        if isinstance(level, ImageSource):
+            level = level.to_image()
+        # Uncompressed so the level can be memory-mapped instead of decoded
+        level.save(os.path.join(cache_dir, name), format='TIFF', compression='raw')
+        entries.append({'file': name, 'scale': scale, 'size': list(level.size), 'mode': level.mode})
+
+    # Written last: a cache without a manifest is ignored
+    with open(os.path.join(cache_dir, MANIFEST_NAME), 'w') as f:
+        json.dump({'source_sha256': source_hash, 'levels': entries}, f, indent=2)
+
+
+def read_pyramid_cache(cache_dir, source_hash):
+    """Return [(scale, MappedImageSource)] if the cache matches source_hash, else None"""
+    try:
+        with open(os.path.join(cache_dir, MANIFEST_NAME)) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('source_sha256') != source_hash or not manifest.get('levels'):
+        return None
+
+    levels = []
+    try:
+        for entry in manifest['levels']:
+            level = open_image_source(os.path.join(cache_dir, entry['file']))
+            if not isinstance(level, MappedImageSource) or list(level.size) != entry['size']:
+                level.close()
+                raise ValueError("Cached level is not a mappable image")
+            levels.append((entry['scale'], level))
+    except (OSError, ValueError):
+        for _, level in levels:
+            level.close()
+        return None
+    return levels
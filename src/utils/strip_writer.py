@@ -0,0 +1,182 @@
+"""Incremental PNG and TIFF encoders.
+
+Both writers take the image as a series of horizontal strips and encode
+each strip as it arrives, so the full image never has to exist in memory.
+"""
+import os
+import struct
+import zlib
+
+
+STREAMING_EXTENSIONS = ('.png', '.tif', '.tiff')
+
+# Bytes per pixel of the modes the writers accept
+MODE_CHANNELS = {'L': 1, 'RGB': 3, 'RGBA': 4}
+
+
+def open_strip_writer(file_path, width, height, mode, dpi=96):
+    """Return a PNG or TIFF strip writer depending on the file extension"""
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.png':
+        return PngStripWriter(file_path, width, height, mode, dpi)
+    if extension in ('.tif', '.tiff'):
+        return TiffStripWriter(file_path, width, height, mode, dpi)
+    raise ValueError(f"Streaming export supports PNG and TIFF, not {extension or 'no extension'}")
+
+
+class StripWriter:
+    def __init__(self, file_path, width, height, mode, dpi):
+        if mode not in MODE_CHANNELS:
+            raise ValueError(f"Unsupported mode for streaming export: {mode}")
+        self.width = width
+        self.height = height
+        self.mode = mode
+        self.dpi = dpi
+        self.rows_written = 0
+        self.file = open(file_path, 'wb')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, traceback):
+        if exc_type is None:
+            self.close()
+        else:
+            self.file.close()
+
+    def write(self, strip):
+        """Append the next horizontal strip (a PIL image of the full width)"""
+        if strip.size[0] != self.width or strip.mode != self.mode:
+            raise ValueError("Strip does not match the image width or mode")
+        if self.rows_written + strip.size[1] > self.height:
+            raise ValueError("More rows written than the image height")
+        self.write_rows(strip.tobytes(), strip.size[1])
+        self.rows_written += strip.size[1]
+
+    def close(self):
+        if self.rows_written != self.height:
+            self.file.close()
+            raise ValueError(f"Only {self.rows_written} of {self.height} rows were written")
+        self.finish()
+        self.file.close()
+
+
+class PngStripWriter(StripWriter):
+    COLOR_TYPES = {'L': 0, 'RGB': 2, 'RGBA': 6}
+    CHUNK_SIZE = 1 << 20
+
+    def __init__(self, file_path, width, height, mode, dpi):
+        super().__init__(file_path, width, height, mode, dpi)
+        self.compressor = zlib.compressobj(6)
+        self.pending = []
+        self.pending_size = 0
+
+        self.file.write(b'\x89PNG\r\n\x1a\n')
+        self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, self.COLOR_TYPES[mode], 0, 0, 0))
+        pixels_per_meter = int(round(dpi / 0.0254))
+        self._chunk(b'pHYs', struct.pack('>IIB', pixels_per_meter, pixels_per_meter, 1))
+
+    def write_rows(self, data, rows):
+        stride = self.width * MODE_CHANNELS[self.mode]
+        # Every scanline starts with its filter type; 0 means unfiltered
+        scanlines = b''.join(b'\x00' + data[row * stride:(row + 1) * stride] for row in range(rows))
+        self._queue(self.compressor.compress(scanlines))
+
+    def finish(self):
+        self._queue(self.compressor.flush())
+        self._flush_idat()
+        self._chunk(b'IEND', b'')
+
+    def _queue(self, data):
+        if data:
+            self.pending.append(data)
+            self.pending_size += len(data)
+        if self.pending_size >= self.CHUNK_SIZE:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self.pending:
+            self._chunk(b'IDAT', b''.join(self.pending))
+            self.pending = []
+            self.pending_size = 0
+
+    def _chunk(self, chunk_type, data):
+        self.file.write(struct.pack('>I', len(data)))
+        self.file.write(chunk_type)
+        self.file.write(data)
+        self.file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+
+class TiffStripWriter(StripWriter):
+    """Little-endian baseline TIFF with one deflate-compressed strip per write"""
+
+    def __init__(self, file_path, width, height, mode, dpi):
+        super().__init__(file_path, width, height, mode, dpi)
+        self.strip_offsets = []
+        self.strip_byte_counts = []
+        self.rows_per_strip = None
+        # Header; the IFD offset is patched in once the strips are written
+        self.file.write(b'II*\x00\x00\x00\x00\x00')
+
+    def write_rows(self, data, rows):
+        if self.rows_per_strip is None:
+            self.rows_per_strip = rows
+        elif rows != self.rows_per_strip and self.rows_written + rows != self.height:
+            raise ValueError("TIFF strips must all have the same height except the last one")
+        compressed = zlib.compress(data, 6)
+        self.strip_offsets.append(self.file.tell())
+        self.strip_byte_counts.append(len(compressed))
+        self.file.write(compressed)
+
+    def finish(self):
+        channels = MODE_CHANNELS[self.mode]
+
+        def data_offset(payload):
+            # Values that do not fit in a 4-byte IFD entry live before the IFD
+            if self.file.tell() % 2:
+                self.file.write(b'\x00')
+            offset = self.file.tell()
+            self.file.write(payload)
+            return offset
+
+        bits = data_offset(struct.pack(f'<{channels}H', *([8] * channels))) if channels > 2 else None
+        resolution = data_offset(struct.pack('<II', int(round(self.dpi * 100)), 100))
+        offsets = data_offset(struct.pack(f'<{len(self.strip_offsets)}I', *self.strip_offsets))
+        counts = data_offset(struct.pack(f'<{len(self.strip_byte_counts)}I', *self.strip_byte_counts))
+
+        SHORT, LONG, RATIONAL = 3, 4, 5
+        entries = [
+            (256, LONG, 1, self.width),
+            (257, LONG, 1, self.height),
+            (258, SHORT, channels, bits if bits is not None else 8),
+            (259, SHORT, 1, 8),                                # Adobe deflate
+            (262, SHORT, 1, 1 if self.mode == 'L' else 2),     # BlackIsZero / RGB
+            (273, LONG, len(self.strip_offsets), offsets),
+            (277, SHORT, 1, channels),
+            (278, LONG, 1, self.rows_per_strip or self.height),
+            (279, LONG, len(self.strip_byte_counts), counts),
+            (282, RATIONAL, 1, resolution),
+            (283, RATIONAL, 1, resolution),
+            (284, SHORT, 1, 1),                                # Chunky
+            (296, SHORT, 1, 2),                                # Inch
+        ]
+        if self.mode == 'RGBA':
+            entries.append((338, SHORT, 1, 2))                 # Unassociated alpha
+
+        # A single strip's offset and byte count fit inline in the entry
+        if len(self.strip_offsets) == 1:
+            entries[5] = (273, LONG, 1, self.strip_offsets[0])
+            entries[8] = (279, LONG, 1, self.strip_byte_counts[0])
+
+        if self.file.tell() % 2:
+            self.file.write(b'\x00')
+        ifd_offset = self.file.tell()
+        self.file.write(struct.pack('<H', len(entries)))
+        for tag, field_type, count, value in entries:
+            packed = struct.pack('<H', value) + b'\x00\x00' if field_type == SHORT and count == 1 \
+                else struct.pack('<I', value)
+            self.file.write(struct.pack('<HHI', tag, field_type, count) + packed)
+        self.file.write(struct.pack('<I', 0))
+
+        self.file.seek(4)
+        self.file.write(struct.pack('<I', ifd_offset))
@@ -0,0 +1,189 @@
+import os
+import queue
+import tkinter as tk
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from PIL import Image
+from src.utils.frame_profiler import FrameProfiler
+
+
+class TileRenderer:
+    """Displays the zoomed image as fixed-size tiles rendered on a thread pool.
+
+    Pillow releases the GIL while resampling, so tiles render in parallel.
+    Finished tiles are handed back to the Tk loop through root.after and
+    cached per zoom level, so panning only renders newly exposed tiles.
+    """
+
+    TILE_SIZE = 256
+    FINAL_RESAMPLE = Image.LANCZOS
+    # Rendered tiles kept across zoom levels (about 48 MB of RGB at 256 px)
+    CACHE_SIZE = 256
+    POLL_INTERVAL_MS = 15
+
+    def __init__(self, root, canvas, image_processor, max_workers=None, profiler=None):
+        self.root = root
+        self.canvas = canvas
+        self.image_processor = image_processor
+        self.profiler = profiler or FrameProfiler()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers or os.cpu_count() or 1)
+        self.results = queue.Queue()
+        self.tile_cache = OrderedDict()
+        self.pending = {}
+        self.displayed = {}
+        self.scaled_size = None
+        self.origin = (0, 0)
+        self.view_size = (0, 0)
+        self.resample = self.FINAL_RESAMPLE
+        self.polling = False
+
+    def reset(self):
+        """Forget every tile, e.g. after a new image has been loaded"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.tile_cache.clear()
+        self.canvas.delete("image_tag")
+        self.displayed.clear()
+        self.scaled_size = None
+
+    def render(self, scaled_width, scaled_height, img_x, img_y, view_width, view_height,
+               resample=FINAL_RESAMPLE):
+        """Show the tiles of the scaled image that fall inside the view.
+
+        Tiles already shown at full quality are never downgraded by a
+        preview request, and a preview tile stays up until its full
+        quality replacement has been rendered.
+        """
+        if (scaled_width, scaled_height) != self.scaled_size:
+            self._change_level(scaled_width, scaled_height)
+        elif (img_x, img_y) != self.origin:
+            self.canvas.move("image_tag", img_x - self.origin[0], img_y - self.origin[1])
+
+        self.origin = (img_x, img_y)
+        self.view_size = (view_width, view_height)
+        self.resample = resample
+
+        visible = set(self.visible_tiles())
+        for key in list(self.displayed):
+            if key[2:] not in visible:
+                self.canvas.delete(self.displayed.pop(key)[1])
+
+        qualities = [self.FINAL_RESAMPLE]
+        if resample != self.FINAL_RESAMPLE:
+            qualities.append(resample)
+
+        for col, row in sorted(visible):
+            key = (scaled_width, scaled_height, col, row)
+            shown = self.displayed.get(key)
+            if shown is not None and shown[2] in qualities:
+                continue
+            for quality in qualities:
+                tile = self.tile_cache.get(key + (quality,))
+                if tile is not None:
+                    self.tile_cache.move_to_end(key + (quality,))
+                    self._show_tile(key, tile, quality)
+                    break
+            else:
+                if key + (resample,) not in self.pending:
+                    self._submit(key + (resample,))
+
+    def pan(self, dx, dy):
+        """Translate the shown tiles without rendering anything"""
+        if self.scaled_size is None:
+            return
+        self.canvas.move("image_tag", dx, dy)
+        self.origin = (self.origin[0] + dx, self.origin[1] + dy)
+
+    def refresh(self):
+        """Render whatever tiles a pan has exposed since the last render"""
+        if self.scaled_size is None:
+            return
+        self.render(self.scaled_size[0], self.scaled_size[1],
+                    self.origin[0], self.origin[1], *self.view_size, resample=self.resample)
+
+    def visible_tiles(self):
+        """Yield (col, row) of every tile inside the current view"""
+        if self.scaled_size is None:
+            return
+        scaled_width, scaled_height = self.scaled_size
+        box = self.image_processor.visible_region(
+            scaled_width, scaled_height, self.origin[0], self.origin[1], *self.view_size)
+        if box is None:
+            return
+
+        left, top, right, bottom = box
+        for row in range(top // self.TILE_SIZE, (bottom - 1) // self.TILE_SIZE + 1):
+            for col in range(left // self.TILE_SIZE, (right - 1) // self.TILE_SIZE + 1):
+                yield col, row
+
+    def _change_level(self, scaled_width, scaled_height):
+        for key, future in list(self.pending.items()):
+            if future.cancel():
+                del self.pending[key]
+        self.canvas.delete("image_tag")
+        self.displayed.clear()
+        self.scaled_size = (scaled_width, scaled_height)
+
+    def _tile_box(self, key):
+        scaled_width, scaled_height, col, row = key[:4]
+        left, top = col * self.TILE_SIZE, row * self.TILE_SIZE
+        return (left, top, min(left + self.TILE_SIZE, scaled_width),
+                min(top + self.TILE_SIZE, scaled_height))
+
+    def _submit(self, key):
+        future = self.executor.submit(self._render_tile, key)
+        self.pending[key] = future
+        future.add_done_callback(lambda f, key=key: self.results.put((key, f)))
+        if not self.polling:
+            self.polling = True
+            self.root.after(self.POLL_INTERVAL_MS, self._drain_results)
+
+    def _drain_results(self):
+        visible = set(self.visible_tiles())
+        while True:
+            try:
+                key, future = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if self.pending.get(key) is not future:
+                continue
+            del self.pending[key]
+            if future.cancelled() or future.exception() is not None:
+                continue
+
+            tile = future.result()
+            self.tile_cache[key] = tile
+            while len(self.tile_cache) > self.CACHE_SIZE:
+                self.tile_cache.popitem(last=False)
+
+            shown = self.displayed.get(key[:4])
+            if shown is not None and shown[2] == self.FINAL_RESAMPLE:
+                continue
+            if key[:2] == self.scaled_size and key[2:4] in visible:
+                self._show_tile(key[:4], tile, key[4])
+
+        if self.pending:
+            self.root.after(self.POLL_INTERVAL_MS, self._drain_results)
+        else:
+            self.polling = False
+
+    def _render_tile(self, key):
+        # Runs on a worker thread
+        with self.profiler.phase('tile render'):
+            return self.image_processor.render_region(key[0], key[1], self._tile_box(key), key[4])
+
+    def _show_tile(self, key, tile, resample):
+        if key in self.displayed:
+            self.canvas.delete(self.displayed.pop(key)[1])
+        # Imported on the first tile rather than at startup
+        from PIL import ImageTk
+
+        with self.profiler.phase('photo'):
+            photo = ImageTk.PhotoImage(tile)
+        left, top = self._tile_box(key)[:2]
+        item = self.canvas.create_image(self.origin[0] + left, self.origin[1] + top,
+                                        image=photo, anchor=tk.NW, tags="image_tag")
+        # Keep tiles underneath the grid and coordinate items
+        self.canvas.tag_lower(item)
+        self.displayed[key] = (photo, item, resample)
@@ -1,42 +1,100 @@
 class UnitConverter:
-    """Handles conversion between different units (px, cm, mm, inch) for grid sizing"""
-    
+    """Handles conversion between different units (px, cm, mm, inch) for grid sizing.
+
+    A converter is bound to one DPI and precomputes its pixels-per-unit
+    table, so every conversion is a single multiplication. Use for_dpi()
+    to share one converter per DPI value.
+    """
+
     # Default DPI for conversion (dots per inch)
     DEFAULT_DPI = 96
-    
-    # Conversion factors to pixels
-    CONVERSIONS = {
-        'px': 1.0,
-        'cm': DEFAULT_DPI / 2.54,  # 1 cm = 2.54 inches
-        'mm': DEFAULT_DPI / 25.4,  # 1 mm = 0.1 cm  
-        'inch': DEFAULT_DPI  # 1 inch = 96 pixels at default DPI
+
+    # Length of one inch in each unit; pixels depend on the DPI
+    UNITS_PER_INCH = {
+        'cm': 2.54,
+        'mm': 25.4,
+        'inch': 1.0,
     }
-    
+    UNITS = ('px', 'cm', 'mm', 'inch')
+
+    # EXIF tags for resolution and its unit (2 = inch, 3 = centimeter)
+    EXIF_X_RESOLUTION = 282
+    EXIF_RESOLUTION_UNIT = 296
+
+    _instances = {}
+
+    def __init__(self, dpi=DEFAULT_DPI):
+        self.dpi = dpi
+        # Conversion factors to pixels
+        self.pixels_per_unit = {'px': 1.0}
+        for unit, per_inch in self.UNITS_PER_INCH.items():
+            self.pixels_per_unit[unit] = dpi / per_inch
+        self.units_per_pixel = {unit: 1.0 / factor for unit, factor in self.pixels_per_unit.items()}
+
     @classmethod
-    def to_pixels(cls, value, unit):
-        """Convert value from given unit to pixels"""
-        if unit not in cls.CONVERSIONS:
+    def for_dpi(cls, dpi):
+        """Shared converter for dpi"""
+        converter = cls._instances.get(dpi)
+        if converter is None:
+            converter = cls._instances[dpi] = cls(dpi)
+        return converter
+
+    def to_pixels(self, value, unit):
+        """Convert value from given unit to (fractional) pixels"""
+        try:
+            return value * self.pixels_per_unit[unit]
+        except KeyError:
             raise ValueError(f"Unsupported unit: {unit}")
-        return value * cls.CONVERSIONS[unit]
-    
-    @classmethod
-    def from_pixels(cls, pixels, unit):
+
+    def from_pixels(self, pixels, unit):
         """Convert pixels to given unit"""
-        if unit not in cls.CONVERSIONS:
+        try:
+            return pixels * self.units_per_pixel[unit]
+        except KeyError:
             raise ValueError(f"Unsupported unit: {unit}")
-        return pixels / cls.CONVERSIONS[unit]
-    
-    @classmethod
-    def convert(cls, value, from_unit, to_unit):
+
+    def convert(self, value, from_unit, to_unit):
         """Convert value from one unit to another"""
-        pixels = cls.to_pixels(value, from_unit)
-        return cls.from_pixels(pixels, to_unit)
-    
+        return self.from_pixels(self.to_pixels(value, from_unit), to_unit)
+
+    @classmethod
+    def dpi_from_info(cls, info, default=None):
+        """DPI recorded in a Pillow image's info dict (dpi, or EXIF resolution), else default"""
+        dpi = info.get('dpi')
+        if dpi:
+            dpi = dpi[0] if isinstance(dpi, tuple) else dpi
+        elif info.get('exif'):
+            dpi = cls._exif_dpi(info['exif'])
+        try:
+            dpi = float(dpi)
+        except (TypeError, ValueError):
+            return default
+        # Files without a real resolution often carry 1 or 0
+        if dpi <= 1:
+            return default
+        return int(round(dpi))
+
+    @classmethod
+    def _exif_dpi(cls, exif_bytes):
+        from PIL import Image
+
+        try:
+            exif = Image.Exif()
+            exif.load(exif_bytes)
+        except Exception:
+            return None
+        resolution = exif.get(cls.EXIF_X_RESOLUTION)
+        if not resolution:
+            return None
+        if exif.get(cls.EXIF_RESOLUTION_UNIT, 2) == 3:
+            return float(resolution) * 2.54
+        return float(resolution)
+
     @classmethod
     def get_available_units(cls):
         """Get list of available units"""
-        return list(cls.CONVERSIONS.keys())
-    
+        return list(cls.UNITS)
+
     @classmethod
     def get_unit_display_name(cls, unit):
         """Get display name for unit"""
@@ -46,4 +104,4 @@ class UnitConverter:
             'mm': 'Millimeters',
             'inch': 'Inches'
         }
-        return names.get(unit, unit)
\ No newline at end of file
+        return names.get(unit, unit)
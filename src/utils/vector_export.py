@@ -0,0 +1,115 @@
+"""Vector grid exports (SVG and PDF).
+
+The resampled picture is embedded once as a raster; grid lines and
+coordinate labels are written as vector paths and text. The file size and
+the time to write it grow with the number of grid lines rather than with
+cells x pixels, and lines stay sharp at any print resolution.
+
+All coordinates are in pixels of the export canvas that GridExporter
+would rasterize, so the vector output lines up with the raster export.
+"""
+import binascii
+import io
+
+from PIL import Image, ImageColor
+
+from src.utils.pdf_writer import PDF_POINTS_PER_INCH, PdfPageWriter, encode_page
+
+
+LABEL_COLOR = "blue"
+SVG_FONT_FAMILY = "Arial, Helvetica, sans-serif"
+PDF_FONT = 'Helvetica'
+# Advance width of a digit in Helvetica, in ems; every digit has the same width
+HELVETICA_DIGIT_WIDTH = 0.556
+# Digits sit this far (in ems) above the baseline at their vertical middle
+HELVETICA_DIGIT_MIDDLE = 0.359
+# Raw bytes per base64 line (a multiple of 3, so lines can be encoded separately)
+BASE64_CHUNK = 57 * 1024
+
+
+def hex_color(color):
+    """Any Pillow/Tk color name as #rrggbb"""
+    return '#%02x%02x%02x' % ImageColor.getrgb(color)[:3]
+
+
+def flatten(image):
+    """The picture on white, as the raster export shows transparent areas"""
+    if image.mode == 'RGB':
+        return image
+    if image.mode in ('RGBA', 'LA') or 'transparency' in image.info:
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.convert('RGBA'))
+        return background
+    return image.convert('RGB')
+
+
+def write_svg(file_path, geometry, picture, grid_color, dpi):
+    """Write an SVG sized to print at dpi.
+
+    geometry is GridExporter.vector_geometry(); picture the resized image
+    placed at geometry['picture_box'].
+    """
+    width, height = geometry['canvas_size']
+    left, top, right, bottom = geometry['picture_box']
+    thickness = geometry['line_thickness']
+    with open(file_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write(f'<svg xmlns="http://www.w3.org/2000/svg" xmlns:xlink="http://www.w3.org/1999/xlink" '
+                f'width="{width / dpi:.4f}in" height="{height / dpi:.4f}in" viewBox="0 0 {width} {height}">\n')
+        f.write(f'<rect width="{width}" height="{height}" fill="white"/>\n')
+
+        # The picture, PNG encoded once and streamed out as base64
+        encoded = io.BytesIO()
+        picture.save(encoded, format='PNG')
+        data = encoded.getbuffer()
+        f.write(f'<image x="{left}" y="{top}" width="{right - left}" height="{bottom - top}" '
+                f'preserveAspectRatio="none" xlink:href="data:image/png;base64,')
+        for start in range(0, len(data), BASE64_CHUNK):
+            f.write(binascii.b2a_base64(data[start:start + BASE64_CHUNK], newline=False).decode('ascii'))
+        f.write('"/>\n')
+        del data
+        encoded.close()
+
+        # Lines cover whole pixels like the raster export, so they run to the far pixel edge
+        path = [f'M{x:g} {top}V{bottom + 1}' for x in geometry['x_lines']]
+        path += [f'M{left} {y:g}H{right + 1}' for y in geometry['y_lines']]
+        f.write(f'<path fill="none" stroke="{hex_color(grid_color)}" stroke-width="{thickness}" '
+                f'shape-rendering="crispEdges" d="{"".join(path)}"/>\n')
+
+        f.write(f'<g font-family="{SVG_FONT_FAMILY}" font-size="{geometry["font_size"]}" '
+                f'fill="{LABEL_COLOR}" text-anchor="middle" dominant-baseline="central">\n')
+        for text, x, y in geometry['labels']:
+            f.write(f'<text x="{x:g}" y="{y:g}">{text}</text>\n')
+        f.write('</g>\n</svg>\n')
+
+
+def write_pdf(file_path, geometry, picture, grid_color, dpi):
+    """Write a one-page PDF sized to print at dpi; see write_svg"""
+    width, height = geometry['canvas_size']
+    left, top, right, bottom = geometry['picture_box']
+    scale = PDF_POINTS_PER_INCH / dpi
+    font_size = geometry['font_size']
+    red, green, blue = (value / 255 for value in ImageColor.getrgb(grid_color)[:3])
+    label_rgb = ' '.join('%.4f' % (value / 255) for value in ImageColor.getrgb(LABEL_COLOR)[:3])
+
+    # Work in export pixels with y pointing down, like the raster export
+    ops = [f'{scale:.6f} 0 0 {-scale:.6f} 0 {height * scale:.4f} cm']
+    # Image space is flipped too, so its first row lands at the top
+    ops.append(f'q {right - left} 0 0 {-(bottom - top)} {left} {bottom} cm /Im0 Do Q')
+
+    ops.append(f'{red:.4f} {green:.4f} {blue:.4f} RG {geometry["line_thickness"]} w 0 J')
+    ops += [f'{x:g} {top} m {x:g} {bottom + 1} l' for x in geometry['x_lines']]
+    ops += [f'{left} {y:g} m {right + 1} {y:g} l' for y in geometry['y_lines']]
+    ops.append('S')
+
+    ops.append(f'BT /F1 {font_size} Tf {label_rgb} rg')
+    for text, x, y in geometry['labels']:
+        # Text matrices flip back so labels are upright, centred on (x, y)
+        text_x = x - len(text) * HELVETICA_DIGIT_WIDTH * font_size / 2
+        text_y = y + HELVETICA_DIGIT_MIDDLE * font_size
+        ops.append(f'1 0 0 -1 {text_x:.2f} {text_y:.2f} Tm ({text}) Tj')
+    ops.append('ET')
+
+    with PdfPageWriter(file_path) as writer:
+        writer.add_drawing_page(width * scale, height * scale, '\n'.join(ops).encode('ascii'),
+                                images={'Im0': encode_page(picture, dpi)}, fonts={'F1': PDF_FONT})